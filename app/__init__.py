@@ -1,9 +1,13 @@
-from flask import Flask, jsonify
+from flask import Flask
 from dotenv import load_dotenv
 from .extensions import db, ma, cache  # Import extensions from extensions.py
+from .cache_backends import init_cache
+from .database import configure_engine_options, init_database
 from flask_migrate import Migrate  # Import Migrate for database migrations
 from flask_swagger_ui import get_swaggerui_blueprint  # Import Swagger UI
-from .swagger import create_swagger_spec  # Import the create_swagger_spec function
+from .swagger import create_swagger_spec, swagger_spec_version  # Import the spec helpers
+from .caching import cached_json_response, SWAGGER_JSON_KEY
+from .serializers import FastJSONProvider
 
 # Load environment variables from .env file
 load_dotenv()
@@ -17,11 +21,14 @@ def create_app():
     """
     app = Flask(__name__)
     app.config.from_object('app.config.Config')
+    app.json = FastJSONProvider(app)  # orjson when installed, stdlib json otherwise
 
     # Initialize extensions
+    configure_engine_options(app)  # Pool and pragma settings from the environment
     db.init_app(app)
+    init_database(app)
     ma.init_app(app)
-    cache.init_app(app)
+    init_cache(app)  # Backend picked from CACHE_BACKEND
     migrate.init_app(app, db)
 
     # Configure Swagger UI
@@ -45,6 +52,8 @@ def create_app():
     from .api.claim import claim_api
     from .api.docs import docs_api
     from .api.login import login_api  # Import the login_api Blueprint
+    from .api.export import export_api
+    from .api.admin import admin_api
 
     # Register Swagger UI blueprint
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
@@ -54,14 +63,33 @@ def create_app():
     app.register_blueprint(claim_api)
     app.register_blueprint(docs_api)
     app.register_blueprint(login_api)  # Register the login_api Blueprint
+    app.register_blueprint(export_api)
+    app.register_blueprint(admin_api)
+
+    # Background flight ingestion (CLI command + optional in-process scheduler)
+    from .ingestion import init_ingestion
+    init_ingestion(app)
+
+    # Batch compensation processing (`flask process-claims`)
+    from .claim_service import init_claim_commands
+    init_claim_commands(app)
+
+    # Optional in-memory flight lookups (FLIGHT_SNAPSHOT_ENABLED)
+    from .flight_snapshot import init_flight_snapshot
+    init_flight_snapshot(app)
 
     # Add a route to serve the OpenAPI specification (swagger.json)
     @app.route('/swagger.json')
     def serve_swagger_json():
         """
         Serve the OpenAPI specification (swagger.json).
+        The spec only changes on deploy, so it is generated once and cached under the
+        version of the code it came from, which a shared or persistent cache outlives.
         """
-        spec = create_swagger_spec(app)  # Generate the OpenAPI specification dynamically
-        return jsonify(spec.to_dict())  # Return the spec as JSON
+        # Generate the OpenAPI specification dynamically
+        return cached_json_response(SWAGGER_JSON_KEY, lambda: (create_swagger_spec(app).to_dict(), 200),
+                                    version=spec_version)
+
+    spec_version = swagger_spec_version(app)  # Every route is registered by now
 
     return app
\ No newline at end of file
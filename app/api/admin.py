@@ -0,0 +1,28 @@
+from flask import Blueprint, current_app, jsonify
+from app.cache_backends import cache_stats
+from app.flight_snapshot import flight_snapshot_stats
+from app.timestamps import timestamp_stats
+from app.token_cache import token_cache_stats
+from app.upstream import upstream_stats
+from app.utils import admin_required
+
+admin_api = Blueprint('admin_api', __name__)
+
+
+@admin_api.route('/admin/stats', methods=['GET'])
+@admin_required
+def get_stats():
+    """
+    Runtime counters of this worker process (Admin Only).
+    :return: JSON response with cache hit/miss/eviction counters, the
+             AviationStack client's circuit state and request latencies, the
+             timestamp parser's counters, the flight snapshot's size and the
+             verified-token cache's counters.
+    """
+    return jsonify({
+        "cache": cache_stats(),
+        "upstream": upstream_stats(current_app),
+        "timestamps": timestamp_stats(),
+        "flight_snapshot": flight_snapshot_stats(current_app),
+        "tokens": token_cache_stats(current_app)
+    })
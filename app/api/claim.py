@@ -1,9 +1,21 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import insert, select
 from app.extensions  import db
-from app.utils import calculate_compensation, admin_required
+from app.utils import admin_required, encode_cursor, decode_cursor, parse_page_limit
 from marshmallow import ValidationError
-from app.schemas import ClaimSchema
-from app.models import Flight, Claim
+from app.schemas import ClaimSchema, CompensationRuleSchema
+from app.models import (
+    Flight, Claim, CompensationRule, SyncState, CLAIMS_DATASET, COMPENSATION_RULES_DATASET,
+    normalize_passenger_name, normalize_flight_number
+)
+from app.serializers import CLAIM_COLUMNS, serialize_claim, serialize_admin_claim
+from app.compensation import get_compiled_rules, invalidate_rules, find_overlapping_rule
+from app.claim_service import process_pending_claims, rescore_changed_claims, PROCESS_CHUNK_SIZE
+from app.flight_snapshot import latest_flight_dates, lookup_flight
+from app.caching import (
+    cached_json_response, conditional_response, claim_status_id_key, claim_status_lookup_key, invalidate_claims,
+    COMPENSATION_RULES_KEY
+)
 
 claim_api = Blueprint('claim_api', __name__)
 
@@ -11,6 +23,7 @@ claim_api = Blueprint('claim_api', __name__)
 def check_claim_status():
     """
     Check the status of a claim made by a passenger.
+    Honours If-None-Match / If-Modified-Since with 304 Not Modified.
     """
     # Get query parameters
     claim_id = request.args.get('claim_id')
@@ -21,31 +34,52 @@ def check_claim_status():
     if not (claim_id or (passenger_name and flight_number)):
         return jsonify({"message": "Either claim_id or passenger_name and flight_number are required"}), 400
 
-    # Query the database for the claim
     if claim_id:
-        claim = Claim.query.get(claim_id)
+        try:
+            claim_id = int(claim_id)
+        except ValueError:
+            return jsonify({"message": "Claim not found"}), 404
+        key = claim_status_id_key(claim_id)
     else:
-        # Trim whitespace and ignore case for passenger_name and flight_number
-        passenger_name = passenger_name.strip().lower()  # Remove leading/trailing spaces and convert to lowercase
-        flight_number = flight_number.strip().lower()  # Remove leading/trailing spaces and convert to lowercase
-        claim = Claim.query.filter(
-            db.func.lower(Claim.passenger_name) == passenger_name,
-            db.func.lower(Claim.flight_number) == flight_number
-        ).first()
+        key = claim_status_lookup_key(passenger_name, flight_number)
+
+    return conditional_response(
+        CLAIMS_DATASET, key,
+        lambda version: cached_json_response(key, lambda: build_claim_status(claim_id, passenger_name, flight_number),
+                                             version=version)
+    )
 
-    if not claim:
-        return jsonify({"message": "Claim not found"}), 404
+
+def build_claim_status(claim_id, passenger_name, flight_number):
+    """Build the (payload, status) of the claim status response."""
+    # Query the database for the claim
+    query = select(*CLAIM_COLUMNS)
+    if claim_id is not None:
+        query = query.where(Claim.id == claim_id)
+    else:
+        # Ignore case and extra whitespace: compare the normalized keys (an index probe)
+        query = query.where(
+            Claim.passenger_key == normalize_passenger_name(passenger_name),
+            Claim.flight_key == normalize_flight_number(flight_number)
+        ).order_by(Claim.id)
+    row = db.session.execute(query.limit(1)).first()
+
+    if not row:
+        return {"message": "Claim not found"}, 404
 
     # Return the claim status and details
-    return jsonify({
-        "claim_id": claim.id,
-        "passenger_name": claim.passenger_name,
-        "flight_number": claim.flight_number,
-        "status": claim.status,
-        "claim_amount": claim.claim_amount,
-        "created_at": claim.created_at.isoformat() if claim.created_at else None,
-        "updated_at": claim.updated_at.isoformat() if claim.updated_at else None
-    })
+    return serialize_claim(row), 200
+
+def find_duplicate_claim(passenger_name, flight_number):
+    """The (id, status) row of the first claim with the same normalized passenger and flight, or None."""
+    return db.session.execute(
+        select(Claim.id, Claim.status).where(
+            Claim.passenger_key == normalize_passenger_name(passenger_name),
+            Claim.flight_key == normalize_flight_number(flight_number)
+        ).order_by(Claim.id).limit(1)
+    ).first()
+
+
 @claim_api.route("/api/claims", methods=['POST'])
 def submit_claim():
     """
@@ -60,18 +94,29 @@ def submit_claim():
         return jsonify(err.messages), 400
     
     flight_number = claim_data.get('flight_number')
-    flight = Flight.query.filter_by(flight_number=flight_number).first()
+    flight = lookup_flight(current_app, flight_number)
     if not flight:
         return jsonify({"message": "Flight not found"}), 404
 
-    # Create a new claim with status "Pending"
+    # One claim per passenger and flight: a repeat submission gets the existing claim
+    existing = find_duplicate_claim(claim_data['passenger_name'], flight_number)
+    if existing:
+        return jsonify({
+            "message": "A claim for this passenger and flight already exists",
+            "claim_id": existing.id,
+            "status": existing.status
+        }), 409
+
+    # Create a new claim with status "Pending", for the latest day of the flight
     new_claim = Claim(
         passenger_name=claim_data['passenger_name'],
         flight_number=flight_number,
+        flight_date=flight.flight_date,
         claim_amount=0,  # Default value, will be updated later
         status="Pending"
     )
     db.session.add(new_claim)
+    SyncState.bump_version(CLAIMS_DATASET)
     db.session.commit()
 
     return jsonify({
@@ -81,42 +126,237 @@ def submit_claim():
     })
 
 
+@claim_api.route("/api/claims/bulk", methods=['POST'])
+def submit_claims_bulk():
+    """
+    Submit up to CLAIMS_BULK_MAX claims at once, e.g. for every passenger of a delayed flight.
+    Flights and duplicates are checked with one query each and the valid claims are
+    inserted in one transaction; items that fail do not stop the others.
+    :return: JSON response with counts and one result per submitted item, in order.
+    """
+    items = request.get_json(silent=True)
+    if isinstance(items, dict):
+        items = items.get('claims')
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Send a non-empty JSON array of claims (or {\"claims\": [...]})"}), 400
+    max_items = current_app.config['CLAIMS_BULK_MAX']
+    if len(items) > max_items:
+        return jsonify({"message": f"At most {max_items} claims per request"}), 400
+
+    try:
+        loaded, errors = ClaimSchema(many=True).load(items), {}
+    except ValidationError as err:
+        loaded, errors = err.valid_data, err.messages  # valid_data is aligned with items
+
+    results = [None] * len(items)
+    candidates = []
+    for index, claim_data in enumerate(loaded):
+        if index in errors:
+            results[index] = {"index": index, "result": "invalid", "errors": errors[index]}
+        else:
+            candidates.append((index, claim_data))
+
+    flights = latest_flight_dates(current_app, (data['flight_number'] for _index, data in candidates))
+
+    # Claims already on file for these passengers and flights, in one query
+    keys = {(normalize_passenger_name(data['passenger_name']), normalize_flight_number(data['flight_number']))
+            for _index, data in candidates if data['flight_number'] in flights}
+    on_file = {}
+    if keys:
+        rows = db.session.execute(
+            select(Claim.id, Claim.status, Claim.passenger_key, Claim.flight_key).where(
+                Claim.passenger_key.in_({passenger_key for passenger_key, _flight_key in keys}),
+                Claim.flight_key.in_({flight_key for _passenger_key, flight_key in keys})
+            ).order_by(Claim.id)
+        )
+        for row in rows:
+            on_file.setdefault((row.passenger_key, row.flight_key), row)
+
+    new_claims, new_indexes, first_index = [], [], {}
+    for index, data in candidates:
+        if data['flight_number'] not in flights:
+            results[index] = {"index": index, "result": "flight_not_found"}
+            continue
+        key = (normalize_passenger_name(data['passenger_name']), normalize_flight_number(data['flight_number']))
+        existing = on_file.get(key)
+        if existing is not None:
+            results[index] = {"index": index, "result": "duplicate", "claim_id": existing.id, "status": existing.status}
+        elif key in first_index:
+            results[index] = {"index": index, "result": "duplicate", "duplicate_of": first_index[key]}
+        else:
+            first_index[key] = index
+            new_indexes.append(index)
+            new_claims.append({
+                "passenger_name": data['passenger_name'],
+                "flight_number": data['flight_number'],
+                "flight_date": flights[data['flight_number']],
+                "claim_amount": 0,  # Default value, will be updated later
+                "status": "Pending"
+            })
+
+    created = []
+    if new_claims:
+        try:
+            created = db.session.execute(
+                insert(Claim).returning(Claim.id, Claim.passenger_name, Claim.flight_number,
+                                        sort_by_parameter_order=True),
+                new_claims
+            ).all()
+            SyncState.bump_version(CLAIMS_DATASET)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print("Database error:", str(e))
+            return jsonify({"message": "Failed to save the claims"}), 500
+
+    for index, row in zip(new_indexes, created):
+        results[index] = {"index": index, "result": "created", "claim_id": row.id, "status": "Pending"}
+    for result in results:
+        if "duplicate_of" in result:
+            # Point a repeat within the request at the claim its first occurrence created
+            first = results[result.pop("duplicate_of")]
+            result["claim_id"], result["status"] = first["claim_id"], first["status"]
+
+    return jsonify({
+        "created": len(created),
+        "rejected": len(items) - len(created),
+        "results": results
+    })
+
+
 @claim_api.route("/compensation-rules", methods=['GET'])
 def get_compensation_rules():
     """
     View the rules for flight delay compensation based on the duration.
-    :return: JSON response with compensation rules.
+    :return: JSON response with the compensation rules in effect today.
     """
-    rules = [
-        {"min_delay": 120, "max_delay": 180, "compensation": "100 TND"},  # 2–3 hours
-        {"min_delay": 180, "max_delay": 240, "compensation": "200 TND"},  # 3–4 hours
-        {"min_delay": 240, "compensation": "300 TND"}  # More than 4 hours
-    ]
-    return jsonify(rules)
+    compiled = get_compiled_rules()
+    return cached_json_response(COMPENSATION_RULES_KEY, lambda: build_compensation_rules(compiled),
+                                version=compiled.version)
+
+
+def build_compensation_rules(compiled):
+    """Build the (payload, status) of the compensation rules response from a CompiledRules."""
+    rules = []
+    for rule in compiled.active_rules():
+        entry = {"min_delay": rule["min_delay"]}
+        if rule["max_delay"] is not None:
+            entry["max_delay"] = rule["max_delay"]
+        entry["compensation"] = f"{rule['amount']:g} {rule['currency']}"
+        if rule.get("airline_name"):
+            entry["airline_name"] = rule["airline_name"]
+        rules.append(entry)
+    return rules, 200
+
+
+@claim_api.route("/admin/compensation-rules", methods=['GET'])
+@admin_required
+def list_compensation_rules():
+    """
+    List every stored compensation rule, including future and expired ones (Admin Only).
+    """
+    rules = CompensationRule.query.order_by(CompensationRule.airline_name, CompensationRule.min_delay).all()
+    return jsonify([rule.to_dict() for rule in rules])
+
+
+@claim_api.route("/admin/compensation-rules", methods=['POST'])
+@admin_required
+def add_compensation_rule():
+    """
+    Add a compensation rule (Admin Only).
+    :return: JSON response with the stored rule.
+    """
+    try:
+        rule_data = CompensationRuleSchema().load(request.get_json() or {})
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    conflict = find_overlapping_rule(rule_data)
+    if conflict:
+        return jsonify({"message": "The delay range overlaps another rule of the same airline and period",
+                        "rule": conflict.to_dict()}), 409
+
+    rule = CompensationRule(**rule_data)
+    db.session.add(rule)
+    SyncState.bump_version(COMPENSATION_RULES_DATASET)
+    db.session.commit()
+    invalidate_rules()
+    return jsonify(rule.to_dict()), 201
+
+
+@claim_api.route("/admin/compensation-rules/<int:rule_id>", methods=['PUT'])
+@admin_required
+def update_compensation_rule(rule_id):
+    """
+    Update a compensation rule (Admin Only).
+    :param rule_id: The ID of the rule to update.
+    """
+    rule = CompensationRule.query.get(rule_id)
+    if not rule:
+        return jsonify({"message": "Rule not found"}), 404
+
+    try:
+        rule_data = CompensationRuleSchema().load({**rule.to_dict(), **(request.get_json() or {})}, unknown='exclude')
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    conflict = find_overlapping_rule(rule_data, exclude_id=rule.id)
+    if conflict:
+        return jsonify({"message": "The delay range overlaps another rule of the same airline and period",
+                        "rule": conflict.to_dict()}), 409
+
+    for name, value in rule_data.items():
+        setattr(rule, name, value)
+    SyncState.bump_version(COMPENSATION_RULES_DATASET)
+    db.session.commit()
+    invalidate_rules()
+    return jsonify(rule.to_dict())
+
+
+@claim_api.route("/admin/compensation-rules/<int:rule_id>", methods=['DELETE'])
+@admin_required
+def delete_compensation_rule(rule_id):
+    """
+    Delete a compensation rule (Admin Only).
+    :param rule_id: The ID of the rule to delete.
+    """
+    rule = CompensationRule.query.get(rule_id)
+    if not rule:
+        return jsonify({"message": "Rule not found"}), 404
+
+    db.session.delete(rule)
+    SyncState.bump_version(COMPENSATION_RULES_DATASET)
+    db.session.commit()
+    invalidate_rules()
+    return jsonify({"message": "Rule deleted successfully"})
 
 @claim_api.route("/admin/claims", methods=['GET'])
 @admin_required
 def get_all_claims():
     """
-    Get a list of all claims (Admin Only).
-    :return: JSON response with all claims.
+    Get a page of claims ordered by id (Admin Only).
+    Query parameters: limit, cursor, status.
+    :return: JSON response with the claims and the cursor of the next page.
     """
-    claims = Claim.query.all()
-    
-    result = []
-    for claim in claims:
-        flight = Flight.query.filter_by(flight_number=claim.flight_number).first()
-        result.append({
-            "claim_id": claim.id,
-            "passenger_name": claim.passenger_name,
-            "flight_number": flight.flight_number if flight else "Unknown",
-            "claim_amount": claim.claim_amount,
-            "status": claim.status,
-            "created_at": claim.created_at,
-            "updated_at": claim.updated_at
-        })
-    
-    return jsonify(result)
+    # Claims and the number of their flight come back as tuples from one outer join
+    query = select(*CLAIM_COLUMNS, Flight.flight_number).outerjoin(Claim.flight)
+    try:
+        limit = parse_page_limit(request.args)
+        if request.args.get('cursor'):
+            query = query.filter(Claim.id > decode_cursor(request.args['cursor']))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    if request.args.get('status'):
+        query = query.filter(Claim.status == request.args['status'])
+
+    rows = db.session.execute(query.order_by(Claim.id).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "claims": [serialize_admin_claim(row) for row in rows],
+        "next_cursor": encode_cursor(rows[-1].id) if has_more else None
+    })
     
 @claim_api.route("/admin/claims/compensation/<int:claim_id>", methods=['GET'])
 @admin_required  # Ensure only admins can access this endpoint
@@ -130,12 +370,12 @@ def calculate_claim_compensation(claim_id):
     if not claim:
         return jsonify({"message": "Claim not found"}), 404
 
-    flight = Flight.query.filter_by(flight_number=claim.flight_number).first()
+    flight = lookup_flight(current_app, claim.flight_number, claim.flight_date)
     if not flight:
         return jsonify({"message": "Flight not found"}), 404
 
     # Calculate compensation based on departure delay
-    compensation = calculate_compensation(flight.departure_delay)
+    compensation, currency = get_compiled_rules().lookup(flight.departure_delay, flight.airline_name, flight.flight_date)
 
     # Update the claim status and compensation amount
     if compensation > 0:
@@ -145,16 +385,40 @@ def calculate_claim_compensation(claim_id):
     claim.claim_amount = compensation
 
     # Commit the changes to the database
+    SyncState.bump_version(CLAIMS_DATASET)
     db.session.commit()
+    invalidate_claims([claim])
 
     return jsonify({
         "claim_id": claim.id,
         "flight_number": claim.flight_number,
         "delay": flight.departure_delay,
-        "eligible_compensation": f"{compensation} TND",
+        "eligible_compensation": f"{compensation:g} {currency}",
         "status": claim.status
     })
     
+@claim_api.route("/admin/claims/compensation/batch", methods=['POST'])
+@admin_required
+def process_pending_claims_batch():
+    """
+    Calculate compensation for all pending claims in chunks, then re-score the decided
+    claims of flights that changed since the last run (Admin Only).
+    Optional JSON body: {"chunk_size": int, "max_claims": int}.
+    :return: JSON response with processing and throughput statistics.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        chunk_size = int(data.get('chunk_size', PROCESS_CHUNK_SIZE))
+        max_claims = int(data['max_claims']) if data.get('max_claims') is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"message": "chunk_size and max_claims must be integers"}), 400
+    if chunk_size < 1 or (max_claims is not None and max_claims < 1):
+        return jsonify({"message": "chunk_size and max_claims must be positive"}), 400
+
+    stats = process_pending_claims(chunk_size=chunk_size, max_claims=max_claims)
+    stats["rescore"] = rescore_changed_claims(chunk_size=chunk_size)
+    return jsonify(stats)
+
 @claim_api.route("/admin/claims/<int:claim_id>", methods=['GET'])
 @admin_required
 def get_claim_details(claim_id):
@@ -163,18 +427,11 @@ def get_claim_details(claim_id):
     :param claim_id: The ID of the claim to fetch details for.
     :return: JSON response with claim details.
     """
-    claim = Claim.query.get(claim_id)
+    row = db.session.execute(
+        select(*CLAIM_COLUMNS, Flight.flight_number).outerjoin(Claim.flight).where(Claim.id == claim_id)
+    ).first()
 
-    if not claim:
+    if not row:
         return jsonify({"message": "Claim not found"}), 404
 
-    flight = Flight.query.filter_by(flight_number=claim.flight_number).first()
-    return jsonify({
-        "claim_id": claim.id,
-        "passenger_name": claim.passenger_name,
-        "flight_number": flight.flight_number if flight else "Unknown",
-        "claim_amount": claim.claim_amount,
-        "status": claim.status,
-        "created_at": claim.created_at,
-        "updated_at": claim.updated_at
-    })
\ No newline at end of file
+    return jsonify(serialize_admin_claim(row))
\ No newline at end of file
@@ -13,7 +13,7 @@ def api_docs():
             {
                 "method": "GET",
                 "path": "/api/flights",
-                "description": "Fetch all flights departing from Tunis-Carthage Airport (TUN)."
+                "description": "List flights departing from Tunis-Carthage Airport (TUN) from the local database, paginated with a cursor and filterable by date range, status, arrival airport, airline and minimum delay."
             },
             {
                 "method": "POST",
@@ -23,18 +23,23 @@ def api_docs():
             {
                 "method": "GET",
                 "path": "/api/flights/<string:flight_number>",
-                "description": "Get details of a specific flight by flight number."
+                "description": "Get details of a specific flight by flight number (its latest day)."
             },
             {
                 "method": "PUT",
                 "path": "/api/flights/<string:flight_number>",
-                "description": "Update details of a specific flight by flight number."
+                "description": "Update details of a specific flight by flight number; the flight_date query parameter picks the day, the latest by default."
             },
             {
                 "method": "POST",
                 "path": "/api/claims",
                 "description": "Submit a new claim for flight delay compensation."
             },
+            {
+                "method": "POST",
+                "path": "/api/claims/bulk",
+                "description": "Submit up to CLAIMS_BULK_MAX claims at once, as a JSON array or {\"claims\": [...]}. Returns created and rejected counts and one result per item, in order. result is created or duplicate with {index, result, claim_id, status} (a duplicate gives the claim already on file), invalid with {index, result, errors}, or flight_not_found with {index, result}."
+            },
             {
                 "method": "GET",
                 "path": "/api/claims/<int:claim_id>",
@@ -45,6 +50,26 @@ def api_docs():
                 "path": "/compensation-rules",
                 "description": "View the rules for flight delay compensation based on the duration."
             },
+            {
+                "method": "GET",
+                "path": "/admin/compensation-rules",
+                "description": "List stored compensation rules (Admin Only)."
+            },
+            {
+                "method": "POST",
+                "path": "/admin/compensation-rules",
+                "description": "Add a compensation rule (Admin Only)."
+            },
+            {
+                "method": "PUT",
+                "path": "/admin/compensation-rules/<int:rule_id>",
+                "description": "Update a compensation rule (Admin Only)."
+            },
+            {
+                "method": "DELETE",
+                "path": "/admin/compensation-rules/<int:rule_id>",
+                "description": "Delete a compensation rule (Admin Only)."
+            },
             {
                 "method": "GET",
                 "path": "/admin/claims",
@@ -55,10 +80,40 @@ def api_docs():
                 "path": "/api/claims/compensation/<int:claim_id>",
                 "description": "Calculate eligible compensation based on the flight number."
             },
+            {
+                "method": "POST",
+                "path": "/admin/claims/compensation/batch",
+                "description": "Calculate compensation for all pending claims in chunks (Admin Only)."
+            },
+            {
+                "method": "GET",
+                "path": "/admin/export/flights",
+                "description": "Stream all flights as NDJSON or a chunked JSON array (Admin Only)."
+            },
+            {
+                "method": "GET",
+                "path": "/admin/export/claims",
+                "description": "Stream all claims as NDJSON or a chunked JSON array (Admin Only)."
+            },
+            {
+                "method": "GET",
+                "path": "/admin/stats",
+                "description": "Runtime counters of the answering worker, such as cache hits and misses (Admin Only)."
+            },
             {
                 "method": "POST",
                 "path": "/api/login",
-                "description": "Authenticate and receive a JWT token for accessing protected endpoints."
+                "description": "Authenticate and receive a JWT access token for accessing protected endpoints, with its lifetime in seconds (expires_in) and a refresh_token."
+            },
+            {
+                "method": "POST",
+                "path": "/admin/token/refresh",
+                "description": "Trade a refresh_token for a new access token and a new refresh_token, in the login response format. Each refresh token works once; reusing one revokes them all."
+            },
+            {
+                "method": "POST",
+                "path": "/admin/logout",
+                "description": "Revoke the access token of the request until it expires, and the refresh_token passed in the body if any (Admin Only)."
             }
         ]
     })
\ No newline at end of file
@@ -0,0 +1,77 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from sqlalchemy import select
+from app.extensions import db
+from app.models import Flight, Claim
+from app.serializers import FLIGHT_COLUMNS, CLAIM_COLUMNS, serialize_flight, serialize_claim, dumps
+from app.api.flight import parse_flight_filters
+from app.utils import admin_required
+
+export_api = Blueprint('export_api', __name__)
+
+EXPORT_BATCH_SIZE = 1000  # Rows fetched per round-trip from the server-side cursor
+
+
+def stream_rows(query, serialize, fmt):
+    """
+    Stream the rows of a query to the client as NDJSON or as a chunked JSON array.
+    Rows are read as column tuples in batches with yield_per, so memory stays bounded.
+    """
+    def generate():
+        rows = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == 'json':
+            yield '['
+            separator = ''
+            for row in rows:
+                yield separator + dumps(serialize(row))
+                separator = ','
+            yield ']\n'
+        else:
+            for row in rows:
+                yield dumps(serialize(row)) + '\n'
+
+    mimetype = 'application/json' if fmt == 'json' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def _export_format():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'json'):
+        raise ValueError("format must be 'ndjson' or 'json'")
+    return fmt
+
+
+@export_api.route('/admin/export/flights', methods=['GET'])
+@admin_required
+def export_flights():
+    """
+    Stream every flight (Admin Only).
+    Accepts the same filters as GET /api/flights, plus format=ndjson|json.
+    :return: Streaming response with one flight per line (NDJSON) or a JSON array.
+    """
+    try:
+        fmt = _export_format()
+        filters = parse_flight_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    query = select(*FLIGHT_COLUMNS).filter(*filters).order_by(Flight.id)
+    return stream_rows(query, serialize_flight, fmt)
+
+
+@export_api.route('/admin/export/claims', methods=['GET'])
+@admin_required
+def export_claims():
+    """
+    Stream every claim (Admin Only).
+    Optional query parameters: status, format=ndjson|json.
+    :return: Streaming response with one claim per line (NDJSON) or a JSON array.
+    """
+    try:
+        fmt = _export_format()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    query = select(*CLAIM_COLUMNS).order_by(Claim.id)
+    if request.args.get('status'):
+        query = query.filter(Claim.status == request.args['status'])
+    return stream_rows(query, serialize_claim, fmt)
@@ -1,34 +1,126 @@
-from flask import Blueprint, jsonify, request
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy import select
 from app.extensions import db
-from app.models import Flight, create_simplified_flight_response
-from app.flight_service import fetch_tunis_flights 
-from app.utils import admin_required# Import your fetcher
+from app.caching import (
+    cached_json_response, conditional_response, flight_list_key, flight_detail_key, invalidate_flights
+)
+from app.models import Flight, SyncState, FLIGHTS_DATASET
+from app.serializers import FLIGHT_COLUMNS, serialize_flight, serialize_flights
+from app.flight_snapshot import lookup_flight, expire_flight_snapshot
+from app.utils import admin_required, encode_cursor, decode_cursor, parse_page_limit
 
 flight_api = Blueprint('flight_api', __name__)
 
-@flight_api.route('/api/flights', methods=['GET'])
-def get_flights():
+# Query parameters of GET /api/flights; the others are ignored, and not part of the cache key
+FLIGHT_LIST_PARAMS = (
+    'limit', 'cursor', 'date_from', 'date_to', 'flight_status', 'arrival_iata', 'airline_name', 'min_delay'
+)
+
+def _parse_date_arg(args, name):
+    """Parse an ISO 8601 date query parameter into a naive datetime."""
+    try:
+        value = Flight.convert_to_datetime(args[name])
+    except Exception:
+        value = None
+    if value is None:
+        raise ValueError(f"Invalid {name}, use an ISO 8601 date")
+    return value.replace(tzinfo=None)
+
+
+def find_flight(flight_number, args):
     """
-    Get a list of flights.
-    :return: JSON response with flight details.
+    The Flight an admin request addresses: the day given by the flight_date query
+    parameter, or else the latest day of the flight number.
+    Raises ValueError on an invalid flight_date.
     """
-    # Fetch fresh flight data from the external API and save to DB
-    flights = fetch_tunis_flights(skip_saving=False)  # Ensure fresh data is saved in the DB
+    query = Flight.query.filter_by(flight_number=flight_number)
+    if args.get('flight_date'):
+        return query.filter(Flight.flight_date == _parse_date_arg(args, 'flight_date')).first()
+    return query.order_by(Flight.flight_date.desc().nulls_last(), Flight.id.desc()).first()
 
-    # If the fetch was unsuccessful, return an error message
-    if flights is None:
-        return jsonify({"error": "Failed to fetch flight data"}), 500
 
-    # Query the database to get all flights
-    flights_db = Flight.query.all()
+def parse_flight_filters(args):
+    """
+    Build SQL filter clauses for the flight listing from query parameters.
+    :return: List of SQLAlchemy filter expressions; raises ValueError on bad input.
+    """
+    filters = []
+
+    if args.get('date_from'):
+        filters.append(Flight.flight_date >= _parse_date_arg(args, 'date_from'))
+    if args.get('date_to'):
+        filters.append(Flight.flight_date <= _parse_date_arg(args, 'date_to'))
+
+    if args.get('flight_status'):
+        filters.append(Flight.flight_status == args['flight_status'])
+    if args.get('arrival_iata'):
+        filters.append(Flight.arrival_iata == args['arrival_iata'].upper())
+    if args.get('airline_name'):
+        filters.append(Flight.airline_name == args['airline_name'])
+    if args.get('min_delay'):
+        try:
+            filters.append(Flight.departure_delay >= float(args['min_delay']))
+        except ValueError:
+            raise ValueError("Invalid min_delay, use a number of minutes")
 
-    # Check if no flights exist in the database
-    if not flights_db:
-        return jsonify({"message": "No flight data available."}), 404
+    return filters
 
-    # Simplify the response data
-    result = [create_simplified_flight_response(flight) for flight in flights_db]
-    return jsonify(result)
+
+@flight_api.route('/api/flights', methods=['GET'])
+def get_flights():
+    """
+    Get a page of flights, ordered by id.
+    Served from the local database only; the ingestion job keeps it fresh.
+    Query parameters: limit, cursor, date_from, date_to, flight_status,
+    arrival_iata, airline_name, min_delay.
+    Honours If-None-Match / If-Modified-Since with 304 Not Modified.
+    :return: JSON response with the flights and the cursor of the next page.
+    """
+    try:
+        limit = parse_page_limit(request.args)
+        filters = parse_flight_filters(request.args)
+        cursor = request.args.get('cursor')
+        if cursor:
+            filters.append(Flight.id > decode_cursor(cursor))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    params = {name: request.args[name] for name in FLIGHT_LIST_PARAMS if request.args.get(name)}
+
+    def build_page():
+        # Keyset pagination: seek past the cursor on the primary key, fetch one extra row
+        # to know whether another page exists
+        rows = db.session.execute(
+            select(*FLIGHT_COLUMNS).filter(*filters).order_by(Flight.id).limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # Check if no flights exist in the database
+        if not rows and not params:
+            return {"message": "No flight data available."}, 404
+
+        return {
+            "flights": serialize_flights(rows),
+            "next_cursor": encode_cursor(rows[-1].id) if has_more else None
+        }, 200
+
+    key = flight_list_key(params)
+    response = conditional_response(FLIGHTS_DATASET, key,
+                                    lambda version: cached_json_response(key, build_page, version=version))
+    add_freshness_headers(response)
+    return response
+
+
+def add_freshness_headers(response):
+    """Tell clients when the local flight data was last refreshed from upstream."""
+    # The sync_state row is already in the session: conditional_response read its version
+    last_refreshed = SyncState.get_last_refreshed(FLIGHTS_DATASET)
+    if last_refreshed:
+        age = max(0, int((datetime.utcnow() - last_refreshed).total_seconds()))
+        response.headers['X-Data-Refreshed-At'] = last_refreshed.isoformat() + 'Z'
+        response.headers['X-Data-Age'] = str(age)
+    return response
 
 
 @flight_api.route('/admin/flights', methods=['POST'])
@@ -44,11 +136,6 @@ def add_flight():
     if not data or 'flight_number' not in data or 'flight_status' not in data:
         return jsonify({"message": "Invalid or missing data"}), 400
 
-    # Check for duplicate flight
-    existing_flight = Flight.query.filter_by(flight_number=data['flight_number']).first()
-    if existing_flight:
-        return jsonify({"message": "Flight with this number already exists"}), 400
-
     # Convert datetime fields
     try:
         flight_date = Flight.convert_to_datetime(data.get('flight_date'))
@@ -62,6 +149,12 @@ def add_flight():
     # Validate required fields
     if not all([flight_date, departure_scheduled, arrival_scheduled]):
         return jsonify({"message": "Missing or invalid datetime fields"}), 400
+    flight_date = flight_date.replace(tzinfo=None)  # Stored as naive UTC, like ingested flights
+
+    # Check for duplicate flight: (flight_number, flight_date) is the natural key
+    existing_flight = Flight.query.filter_by(flight_number=data['flight_number'], flight_date=flight_date).first()
+    if existing_flight:
+        return jsonify({"message": "Flight with this number already exists on this date"}), 400
 
     # Map the incoming API data to the Flight model fields
     new_flight = Flight(
@@ -81,11 +174,15 @@ def add_flight():
         arrival_actual=arrival_actual,  # Actual arrival from external API
         airline_name=data['airline']['name']  # Airline name from external API
     )
+    new_flight.touch()  # Fingerprint the new row and stamp last_modified
 
     # Add and commit to database
     try:
         db.session.add(new_flight)
+        SyncState.bump_version(FLIGHTS_DATASET)
         db.session.commit()
+        invalidate_flights([new_flight.flight_number])
+        expire_flight_snapshot(current_app)
     except Exception as e:
         db.session.rollback()
         print("Database error:", str(e))
@@ -100,39 +197,27 @@ def add_flight():
 def get_flight_details(flight_number):
     """
     Get details of a specific flight by flight_number.
+    Honours If-None-Match / If-Modified-Since with 304 Not Modified.
     :param flight_number: The flight_number of the flight to fetch details for.
     :return: JSON response with flight details.
     """
-    flight = Flight.query.filter_by(flight_number=flight_number).first()
+    return conditional_response(
+        FLIGHTS_DATASET, flight_number,
+        lambda version: cached_json_response(flight_detail_key(flight_number),
+                                             lambda: build_flight_details(flight_number), version=version)
+    )
 
-    if not flight:
-        return jsonify({"message": "Flight not found"}), 404
 
-    # Simplify the response data
-    simplified_flight = {
-        "flight_number": flight.flight_number,
-        "flight_date": flight.flight_date.isoformat() if flight.flight_date else None,
-        "flight_status": flight.flight_status,
-        "departure": {
-            "airport": flight.departure_airport,
-            "timezone": flight.departure_timezone,
-            "iata": flight.departure_iata,
-            "delay": flight.departure_delay,
-            "scheduled": flight.departure_scheduled.isoformat() if flight.departure_scheduled else None,
-            "actual": flight.departure_actual.isoformat() if flight.departure_actual else None
-        },
-        "arrival": {
-            "airport": flight.arrival_airport,
-            "timezone": flight.arrival_timezone,
-            "iata": flight.arrival_iata,
-            "scheduled": flight.arrival_scheduled.isoformat() if flight.arrival_scheduled else None,
-            "actual": flight.arrival_actual.isoformat() if flight.arrival_actual else None
-        },
-        "airline": {
-            "name": flight.airline_name
-        }
-    }
-    return jsonify(simplified_flight)
+def build_flight_details(flight_number):
+    """Build the (payload, status) of the flight details response."""
+    row = lookup_flight(current_app, flight_number)
+
+    if not row:
+        return {"message": "Flight not found"}, 404
+
+    simplified_flight = serialize_flight(row)
+    del simplified_flight["id"]  # The details response has never exposed the id
+    return simplified_flight, 200
 
 
 @flight_api.route('/admin/flights/<string:flight_number>', methods=['PUT'])
@@ -140,11 +225,15 @@ def get_flight_details(flight_number):
 def update_flight(flight_number):
     """
     Update details of a specific flight by flight_number.
+    The flight_date query parameter picks the day; without it the latest day is updated.
     :param flight_number: The flight_number of the flight to update.
     :return: JSON response with the updated flight details.
     """
     data = request.get_json()
-    flight = Flight.query.filter_by(flight_number=flight_number).first()
+    try:
+        flight = find_flight(flight_number, request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
     if not flight:
         return jsonify({"message": "Flight not found"}), 404
@@ -153,10 +242,18 @@ def update_flight(flight_number):
     print("Incoming data:", data)
 
     # Update the flight details with the incoming data
-    if 'flight_number' in data:
-        flight.flight_number = data['flight_number']
-    if 'flight_date' in data:
-        flight.flight_date = Flight.convert_to_datetime(data['flight_date'])
+    if 'flight_number' in data or 'flight_date' in data:
+        new_number = data.get('flight_number', flight.flight_number)
+        new_date = flight.flight_date
+        if 'flight_date' in data:
+            new_date = Flight.convert_to_datetime(data['flight_date'])
+            new_date = new_date.replace(tzinfo=None) if new_date else None
+        # (flight_number, flight_date) is unique; refuse to move onto another flight
+        if (new_number, new_date) != (flight.flight_number, flight.flight_date) and \
+                Flight.query.filter_by(flight_number=new_number, flight_date=new_date).first():
+            return jsonify({"message": "Flight with this number already exists on this date"}), 400
+        flight.flight_number = new_number
+        flight.flight_date = new_date
     if 'flight_status' in data:
         flight.flight_status = data['flight_status']
 
@@ -194,7 +291,11 @@ def update_flight(flight_number):
     if 'airline' in data and 'name' in data['airline']:
         flight.airline_name = data['airline']['name']
 
+    flight.touch()  # Keep the fingerprint in sync so re-ingestion sees the edit
+    SyncState.bump_version(FLIGHTS_DATASET)
     db.session.commit()
+    invalidate_flights([flight_number, flight.flight_number])
+    expire_flight_snapshot(current_app)
 
     return jsonify({"message": "Flight updated successfully"})
 
@@ -203,16 +304,23 @@ def update_flight(flight_number):
 def delete_flight(flight_number):
     """
     Delete a specific flight by flight_number.
+    The flight_date query parameter picks the day; without it the latest day is deleted.
     :param flight_number: The flight_number of the flight to delete.
     :return: JSON response with the deletion result.
     """
-    flight = Flight.query.filter_by(flight_number=flight_number).first()
+    try:
+        flight = find_flight(flight_number, request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
     if not flight:
         return jsonify({"message": "Flight not found"}), 404
 
     # Delete the flight from the database
     db.session.delete(flight)
+    SyncState.bump_version(FLIGHTS_DATASET)
     db.session.commit()
+    invalidate_flights([flight_number])
+    expire_flight_snapshot(current_app)
 
     return jsonify({"message": "Flight deleted successfully"})
@@ -1,31 +1,124 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 import jwt
+from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timedelta
+from app.extensions import db
 from app.models import Admin
+from app import rate_limit
+from app.rate_limit import RateLimited
+from app.passwords import HashingPoolBusy, check_password, get_hashing_pool
+from app.refresh_tokens import issue_refresh_token, rotate_refresh_token, revoke_refresh_token
+from app.token_cache import revoke_token
+from app.utils import admin_required
 
 # Define the login_api Blueprint
 login_api = Blueprint('login_api', __name__)
 
+
+def issue_access_token(username):
+    """A signed admin JWT valid for JWT_ACCESS_TOKEN_TTL seconds."""
+    return jwt.encode({
+        'username': username,
+        'role': 'admin',  # Add role for role-based access control
+        'exp': datetime.utcnow() + timedelta(seconds=current_app.config['JWT_ACCESS_TOKEN_TTL'])
+    }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
+
+
+def token_response(username, refresh_token):
+    return jsonify({
+        "token": issue_access_token(username),
+        "refresh_token": refresh_token,
+        "expires_in": current_app.config['JWT_ACCESS_TOKEN_TTL']
+    })
+
+
 @login_api.route("/admin/login", methods=['POST'])
 def login():
     """
     Authenticate and receive a JWT token for accessing protected endpoints.
+    Attempts are rate limited per client IP and failures per username; the password
+    is checked on the bounded hashing pool, never on the request thread.
     """
     data = request.get_json()
     username = data.get('username')
     password = data.get('password')
+    if not username or not password:
+        return jsonify({"message": "Invalid credentials"}), 401
+
+    config = current_app.config
+    window = config['LOGIN_RATE_WINDOW']
+    client_ip = request.remote_addr or 'unknown'
+    try:
+        # Refuse floods before spending any CPU on hashing. A failure is reserved before
+        # the check, so parallel guesses cannot all pass a limit they have not hit yet.
+        rate_limit.reserve('login-ip', client_ip, config['LOGIN_MAX_ATTEMPTS_PER_IP'], window)
+        rate_limit.reserve('login-user', username, config['LOGIN_MAX_FAILURES_PER_USERNAME'], window)
+    except RateLimited as e:
+        response = jsonify({"message": "Too many login attempts, try again later"})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
 
     # Check if the admin exists in the database
     admin = Admin.query.filter_by(username=username).first()
 
-    if admin and admin.check_password(password):
-        # Generate a JWT token with a "role" claim
-        token = jwt.encode({
-            'username': username,
-            'role': 'admin',  # Add role for role-based access control
-            'exp': datetime.utcnow() + timedelta(hours=1)  # Token expires in 1 hour
-        }, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
-
-        return jsonify({"token": token})
-    else:
-        return jsonify({"message": "Invalid credentials"}), 401
\ No newline at end of file
+    try:
+        matches, new_hash = get_hashing_pool(current_app).run(
+            check_password, admin.password_hash if admin else None, password, config['PASSWORD_HASH_METHOD'],
+            timeout=config['LOGIN_HASH_TIMEOUT']
+        )
+    except HashingPoolBusy:
+        rate_limit.refund('login-user', username, window)  # The password was never checked
+        response = jsonify({"message": "Too many logins in progress, try again shortly"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    if not matches:
+        return jsonify({"message": "Invalid credentials"}), 401  # The reserved failure stays counted
+
+    rate_limit.reset('login-user', username)
+    if new_hash:
+        # Stored with an older method or cost: upgrade it now that the password is known
+        admin.password_hash = new_hash
+        try:
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # e.g. a password_hash column not migrated to 256 yet: keep the old hash, still log in
+            db.session.rollback()
+            print(f"Password hash upgrade failed for {username}: {e.__class__.__name__}")
+    refresh_token = issue_refresh_token(admin.id, config['JWT_REFRESH_TOKEN_TTL'])
+    db.session.commit()
+
+    return token_response(username, refresh_token)
+
+
+@login_api.route("/admin/token/refresh", methods=['POST'])
+def refresh_token():
+    """
+    Trade a refresh token for a new access token and a new refresh token, without a
+    password check. Each refresh token works once; reusing one revokes them all.
+    """
+    data = request.get_json(silent=True) or {}
+    token = data.get('refresh_token')
+    if not isinstance(token, str) or not token:
+        return jsonify({"message": "refresh_token is required"}), 400
+
+    rotated = rotate_refresh_token(token, current_app.config['JWT_REFRESH_TOKEN_TTL'])
+    admin = Admin.query.get(rotated[0]) if rotated else None
+    if admin is None:
+        return jsonify({"message": "Invalid or expired refresh token"}), 401
+
+    return token_response(admin.username, rotated[1])
+
+
+@login_api.route("/admin/logout", methods=['POST'])
+@admin_required
+def logout():
+    """
+    Revoke the token of the request, and the refresh token passed in the body if
+    any; the access token is refused until it expires.
+    """
+    revoke_token(current_app, g.admin_token, g.admin_claims)
+    data = request.get_json(silent=True) or {}
+    if isinstance(data.get('refresh_token'), str):
+        revoke_refresh_token(data['refresh_token'])
+    return jsonify({"message": "Logged out"})
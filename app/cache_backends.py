@@ -0,0 +1,264 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from flask_caching.backends.base import BaseCache
+from flask_caching.backends.filesystemcache import FileSystemCache
+from app.extensions import cache
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def evicted(self, count=1):
+        with self._lock:
+            self.evictions += count
+
+    def as_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None
+        }
+
+
+class LRUCache(BaseCache):
+    """In-process cache holding at most `max_entries` values, evicting the least recently used."""
+
+    def __init__(self, max_entries=10000, default_timeout=300):
+        super().__init__(default_timeout=default_timeout)
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at or None, value)
+        self._lock = threading.Lock()
+        self.counters = CacheStats()
+
+    def _expires_at(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        return time.monotonic() + timeout if timeout > 0 else None
+
+    def _live_entry(self, key):
+        """Return the entry for key if present and not expired (caller holds the lock)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] is not None and entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        self.counters.record(entry is not None)
+        return entry[1] if entry is not None else None
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            self._entries[key] = (self._expires_at(timeout), value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        if evicted:
+            self.counters.evicted(evicted)
+        return True
+
+    def add(self, key, value, timeout=None):
+        with self._lock:
+            if self._live_entry(key) is not None:
+                return False
+        return self.set(key, value, timeout)
+
+    def inc(self, key, delta=1):
+        """Atomic increment; a new key starts from 0 with the default timeout, an existing one keeps its expiry."""
+        with self._lock:
+            entry = self._live_entry(key)
+            if entry is None:
+                entry = (self._expires_at(None), 0)
+            value = entry[1] + delta
+            self._entries[key] = (entry[0], value)
+            self._entries.move_to_end(key)
+        return value
+
+    def delete(self, key):
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def has(self, key):
+        with self._lock:
+            return self._live_entry(key) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        return True
+
+    def stats(self):
+        return {"backend": "lru", "entries": len(self._entries), "max_entries": self.max_entries,
+                **self.counters.as_dict()}
+
+
+class InstrumentedCache(BaseCache):
+    """Wraps a shared backend (filesystem, Redis) to count hits and misses."""
+
+    def __init__(self, backend, name):
+        super().__init__(default_timeout=backend.default_timeout)
+        self.backend = backend
+        self.name = name
+        self.counters = CacheStats()
+
+    def get(self, key):
+        value = self.backend.get(key)
+        self.counters.record(value is not None)
+        return value
+
+    def set(self, key, value, timeout=None):
+        return self.backend.set(key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        return self.backend.add(key, value, timeout)
+
+    def inc(self, key, delta=1):
+        return self.backend.inc(key, delta)  # Atomic on Redis
+
+    def delete(self, key):
+        return self.backend.delete(key)
+
+    def has(self, key):
+        return self.backend.has(key)
+
+    def clear(self):
+        return self.backend.clear()
+
+    def stats(self):
+        # Shared backends evict on their own; evictions are not observable from here
+        stats = {"backend": self.name, **self.counters.as_dict()}
+        stats["evictions"] = None
+        return stats
+
+
+class TieredCache(BaseCache):
+    """A per-process LRU (level 1) in front of a cache shared by all workers (level 2)."""
+
+    def __init__(self, local, shared, local_timeout=5):
+        super().__init__(default_timeout=shared.default_timeout)
+        self.local = local
+        self.shared = shared
+        self.local_timeout = local_timeout
+
+    def _local_ttl(self, timeout):
+        if timeout is None:
+            timeout = self.default_timeout
+        return self.local_timeout if timeout <= 0 else min(timeout, self.local_timeout)
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value, self.local_timeout)
+        return value
+
+    def set(self, key, value, timeout=None):
+        result = self.shared.set(key, value, timeout)
+        self.local.set(key, value, self._local_ttl(timeout))
+        return result
+
+    def add(self, key, value, timeout=None):
+        added = self.shared.add(key, value, timeout)
+        if added:
+            self.local.set(key, value, self._local_ttl(timeout))
+        return added
+
+    def inc(self, key, delta=1):
+        # Counters live in the shared level only, so every worker counts together
+        self.local.delete(key)
+        return self.shared.inc(key, delta)
+
+    def delete(self, key):
+        local = self.local.delete(key)
+        shared = self.shared.delete(key)
+        return local or shared
+
+    def has(self, key):
+        return self.local.has(key) or self.shared.has(key)
+
+    def clear(self):
+        self.local.clear()
+        return self.shared.clear()
+
+    def stats(self):
+        return {"backend": "tiered", "l1": self.local.stats(), "l2": self.shared.stats()}
+
+
+# Flask-Caching factories, referenced by import path in CACHE_TYPE
+
+def lru(app, config, args, kwargs):
+    return LRUCache(max_entries=config['CACHE_LRU_MAX_ENTRIES'], default_timeout=kwargs['default_timeout'])
+
+
+def filesystem(app, config, args, kwargs):
+    config.setdefault('CACHE_DIR', None)
+    if not config['CACHE_DIR']:
+        config['CACHE_DIR'] = os.path.join(app.instance_path, 'cache')
+    return InstrumentedCache(FileSystemCache.factory(app, config, list(args), dict(kwargs)), 'filesystem')
+
+
+def redis(app, config, args, kwargs):
+    # Any server speaking the Redis protocol works, e.g. a local fake in tests
+    from flask_caching.backends.rediscache import RedisCache
+    return InstrumentedCache(RedisCache.factory(app, config, list(args), dict(kwargs)), 'redis')
+
+
+SHARED_BACKENDS = {'filesystem': filesystem, 'redis': redis}
+
+
+def tiered(app, config, args, kwargs):
+    shared_name = config['CACHE_SHARED_BACKEND']
+    if shared_name not in SHARED_BACKENDS:
+        raise ValueError(f"CACHE_SHARED_BACKEND must be one of {sorted(SHARED_BACKENDS)}")
+    shared = SHARED_BACKENDS[shared_name](app, config, args, kwargs)
+    local = LRUCache(max_entries=config['CACHE_LRU_MAX_ENTRIES'], default_timeout=kwargs['default_timeout'])
+    return TieredCache(local, shared, local_timeout=config['CACHE_L1_TIMEOUT'])
+
+
+BACKENDS = {
+    'lru': 'app.cache_backends.lru',
+    'filesystem': 'app.cache_backends.filesystem',
+    'redis': 'app.cache_backends.redis',
+    'tiered': 'app.cache_backends.tiered',
+}
+
+
+def init_cache(app):
+    """Point Flask-Caching at the backend named by CACHE_BACKEND and initialise it."""
+    backend = app.config['CACHE_BACKEND']
+    if backend not in BACKENDS:
+        raise ValueError(f"CACHE_BACKEND must be one of {sorted(BACKENDS)}, got {backend!r}")
+    app.config['CACHE_TYPE'] = BACKENDS[backend]
+    cache.init_app(app)
+
+
+def cache_stats():
+    """Counters of the current app's cache backend (for the admin stats endpoint)."""
+    backend = cache.cache
+    return backend.stats() if hasattr(backend, 'stats') else {"backend": type(backend).__name__}
@@ -0,0 +1,122 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, request
+from app.extensions import cache
+from app.models import SyncState, normalize_passenger_name, normalize_flight_number
+
+# Cache keys. Entries derived from flights or claims carry the dataset version they
+# were built from, so a write by any process retires them; the keys of the rows a
+# process wrote are also deleted right away.
+COMPENSATION_RULES_KEY = 'compensation_rules'
+SWAGGER_JSON_KEY = 'swagger_json'
+
+
+def _params_digest(params):
+    """Stable digest of a {name: value} dict of query parameters, independent of their order."""
+    return hashlib.md5(repr(sorted(params.items())).encode('utf-8')).hexdigest()
+
+
+def dataset_version(dataset):
+    """
+    (version, modified_at) of a dataset, read from sync_state: one primary-key probe,
+    and later reads in the same request come from the session. It is not cached, so
+    writes made by other processes (e.g. `flask ingest-flights`) are seen at once.
+    """
+    return SyncState.get_version(dataset)
+
+
+def flight_list_key(params):
+    """:param params: The recognised listing parameters, so unknown ones cannot mint new keys."""
+    return f"flights:list:{_params_digest(params)}"
+
+
+def flight_detail_key(flight_number):
+    return f"flight:{flight_number}"
+
+
+def claim_status_id_key(claim_id):
+    return f"claim_status:id:{claim_id}"
+
+
+def claim_status_lookup_key(passenger_name, flight_number):
+    # The same keys the lookup compares, so every spelling of one claim shares an entry
+    return f"claim_status:lookup:{normalize_passenger_name(passenger_name)}:{normalize_flight_number(flight_number)}"
+
+
+def cached_json_response(key, build, timeout=None, version=None):
+    """
+    Serve a JSON response from the cache, calling build() -> (payload, status) on a miss.
+    The serialized body is cached, so a hit skips both the database and JSON encoding.
+    Only 200 responses are cached: the keys of misses (an unknown flight number, a
+    passenger without a claim) come from user input.
+    :param version: Version of the dataset the response is built from; an entry built
+                    from another version is rebuilt.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[0] == version:
+        body, status = entry[1], 200
+    else:
+        payload, status = build()
+        body = current_app.json.dumps(payload) + "\n"
+        if status == 200:
+            cache.set(key, (version, body), timeout=timeout)
+    return current_app.response_class(body, status=status, mimetype='application/json')
+
+
+def _delete_keys(keys):
+    # Not cache.delete_many(): some backends stop at the first key that is not cached
+    for key in keys:
+        cache.delete(key)
+
+
+def conditional_response(dataset, tag, make_response):
+    """
+    Answer 304 Not Modified when the client's copy is current, otherwise call make_response(version).
+    The validators (ETag and Last-Modified) come from the dataset's version counter, so a
+    304 costs one sync_state read, but neither a row query nor JSON serialization.
+    :param dataset: Dataset the response is derived from (e.g. FLIGHTS_DATASET).
+    :param tag: Identifies the resource within the dataset (query string, flight number...).
+    """
+    version, modified_at = dataset_version(dataset)
+    etag = f"{dataset}-{version}-{hashlib.md5(tag.encode('utf-8')).hexdigest()[:16]}"
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(
+            modified_at and request.if_modified_since and
+            modified_at.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+        )
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        response = make_response(version)
+        if response.status_code != 200:
+            return response
+
+    response.set_etag(etag)
+    if modified_at:
+        response.last_modified = modified_at
+    return response
+
+
+def invalidate_flights(flight_numbers):
+    """Drop the cached detail of the given flights; list pages go with the version bump."""
+    _delete_keys(flight_detail_key(number) for number in set(flight_numbers) if number)
+
+
+def invalidate_claims(claims):
+    """
+    Drop the cached status of the given claims.
+    :param claims: Iterable of objects with id, passenger_name and flight_number.
+    """
+    keys = []
+    for claim in claims:
+        keys.append(claim_status_id_key(claim.id))
+        keys.append(claim_status_lookup_key(claim.passenger_name, claim.flight_number))
+    _delete_keys(keys)
+
+
+def invalidate_compensation_rules():
+    cache.delete(COMPENSATION_RULES_KEY)
@@ -0,0 +1,157 @@
+import time
+from datetime import datetime
+import click
+from sqlalchemy import and_, select, update
+from app.extensions import db
+from app.models import Claim, Flight, SyncState, CLAIMS_DATASET
+from app.compensation import get_compiled_rules
+from app.caching import invalidate_claims
+from app.flight_service import get_flights_modified_since
+from app.flight_snapshot import SYNC_OVERLAP
+
+PROCESS_CHUNK_SIZE = 500  # Pending claims scored and updated per transaction
+
+DECIDED_STATUSES = ("Approved", "Denied")  # Set by the engine; re-scored when their flight changes
+RESCORE_STATE = 'claims_rescored'  # sync_state row whose last_refreshed_at is the re-scoring watermark
+
+
+def claim_flight_join():
+    """Join condition of a claim and the flight it was filed for: same number, same day."""
+    return and_(Flight.flight_number == Claim.flight_number,
+                Flight.flight_date.is_not_distinct_from(Claim.flight_date))
+
+
+def score_claim(rules, row):
+    """(status, amount) of a claim from its flight's delay, airline and date."""
+    amount, _currency = rules.lookup(row.departure_delay, row.airline_name, row.flight_date)
+    return ("Approved" if amount > 0 else "Denied"), amount
+
+
+def process_pending_claims(chunk_size=PROCESS_CHUNK_SIZE, max_claims=None):
+    """
+    Score every "Pending" claim against its flight's departure delay.
+    Claims are walked in id order, one chunk at a time: each chunk is joined to its
+    flights in one query, scored in one pass and bulk-updated in one transaction.
+    Claims whose flight is unknown stay "Pending".
+    :param chunk_size: Number of claims per chunk.
+    :param max_claims: Optional cap on the number of claims to look at.
+    :return: Dict with counts and throughput statistics.
+    """
+    stats = {"processed": 0, "approved": 0, "denied": 0, "skipped": 0, "chunks": 0}
+    started = time.perf_counter()
+    rules = get_compiled_rules()  # Compiled once for the whole run; each lookup is a bisection
+    last_id = 0
+
+    while max_claims is None or stats["processed"] + stats["skipped"] < max_claims:
+        size = chunk_size
+        if max_claims is not None:
+            size = min(size, max_claims - stats["processed"] - stats["skipped"])
+
+        rows = db.session.execute(
+            select(Claim.id, Claim.passenger_name, Claim.flight_number,
+                   Flight.id.label('flight_id'), Flight.departure_delay,
+                   Flight.airline_name, Flight.flight_date)
+            .outerjoin(Flight, claim_flight_join())
+            .where(Claim.status == "Pending", Claim.id > last_id)
+            .order_by(Claim.id)
+            .limit(size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        scorable = [row for row in rows if row.flight_id is not None]
+        stats["skipped"] += len(rows) - len(scorable)
+
+        now = datetime.utcnow()
+        updates = []
+        for row in scorable:
+            status, amount = score_claim(rules, row)
+            stats[status.lower()] += 1
+            updates.append({"id": row.id, "status": status, "claim_amount": amount, "updated_at": now})
+
+        try:
+            if updates:
+                db.session.execute(update(Claim), updates)
+                SyncState.bump_version(CLAIMS_DATASET, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        invalidate_claims(scorable)
+        stats["processed"] += len(updates)
+        stats["chunks"] += 1
+
+    elapsed = time.perf_counter() - started
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["claims_per_second"] = round(stats["processed"] / elapsed, 1) if elapsed > 0 else None
+    return stats
+
+
+def rescore_changed_claims(chunk_size=PROCESS_CHUNK_SIZE):
+    """
+    Score the decided claims again when their flight changed since the last run (a delay
+    corrected upstream after the claim was scored). Changed flights come from their
+    last_modified; only claims whose status or amount changes are written.
+    :return: Dict with the number of changed flights and of claims whose outcome changed.
+    """
+    stats = {"changed_flights": 0, "rescored": 0}
+    started_at = datetime.utcnow()
+    since = SyncState.get_last_refreshed(RESCORE_STATE)
+    # A writer stamps last_modified before it commits, so look back a little past the watermark
+    changed = get_flights_modified_since(since - SYNC_OVERLAP if since else None)
+    flight_ids = [row.id for row in changed.with_entities(Flight.id)]
+    stats["changed_flights"] = len(flight_ids)
+    rules = get_compiled_rules()
+
+    for start in range(0, len(flight_ids), chunk_size):
+        # Only the claims filed for the changed day of a flight number
+        rows = db.session.execute(
+            select(Claim.id, Claim.passenger_name, Claim.flight_number, Claim.status, Claim.claim_amount,
+                   Flight.departure_delay, Flight.airline_name, Flight.flight_date)
+            .join(Flight, claim_flight_join())
+            .where(Flight.id.in_(flight_ids[start:start + chunk_size]),
+                   Claim.status.in_(DECIDED_STATUSES))
+        ).all()
+
+        now = datetime.utcnow()
+        updates, rescored = [], []
+        for row in rows:
+            status, amount = score_claim(rules, row)
+            if status != row.status or amount != row.claim_amount:
+                updates.append({"id": row.id, "status": status, "claim_amount": amount, "updated_at": now})
+                rescored.append(row)
+
+        try:
+            if updates:
+                db.session.execute(update(Claim), updates)
+                SyncState.bump_version(CLAIMS_DATASET, now)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        invalidate_claims(rescored)
+        stats["rescored"] += len(updates)
+
+    SyncState.mark_refreshed(RESCORE_STATE, started_at)
+    db.session.commit()
+    return stats
+
+
+def init_claim_commands(app):
+    """Register the `flask process-claims` command."""
+    @app.cli.command('process-claims')
+    @click.option('--chunk-size', default=PROCESS_CHUNK_SIZE, show_default=True, help='Claims per transaction.')
+    @click.option('--limit', 'max_claims', type=int, default=None, help='Stop after this many claims.')
+    def process_claims_command(chunk_size, max_claims):
+        """Calculate compensation for all pending claims."""
+        stats = process_pending_claims(chunk_size=chunk_size, max_claims=max_claims)
+        click.echo(
+            f"Processed {stats['processed']} claims ({stats['approved']} approved, {stats['denied']} denied, "
+            f"{stats['skipped']} without a flight) in {stats['elapsed_seconds']}s "
+            f"({stats['claims_per_second']} claims/s)."
+        )
+        rescore = rescore_changed_claims(chunk_size=chunk_size)
+        click.echo(f"Re-scored {rescore['rescored']} decided claims of {rescore['changed_flights']} changed flights.")
@@ -0,0 +1,155 @@
+import threading
+from bisect import bisect_right
+from datetime import date, datetime
+from app.models import CompensationRule, COMPENSATION_RULES_DATASET
+from app.caching import dataset_version, invalidate_compensation_rules
+
+class RuleTable:
+    """Non-overlapping delay tiers sharing one airline and effective period, sorted for bisection."""
+
+    __slots__ = ('airline_name', 'effective_from', 'effective_to', 'bounds', 'tiers')
+
+    def __init__(self, airline_name, effective_from, effective_to, rules):
+        self.airline_name = airline_name
+        self.effective_from = effective_from
+        self.effective_to = effective_to
+        rules = sorted(rules, key=lambda rule: rule["min_delay"])
+        self.bounds = [rule["min_delay"] for rule in rules]
+        self.tiers = [(rule["max_delay"], rule["amount"], rule["currency"]) for rule in rules]
+
+    def applies_on(self, day):
+        return ((self.effective_from is None or self.effective_from <= day) and
+                (self.effective_to is None or day <= self.effective_to))
+
+    def lookup(self, delay):
+        """Return (amount, currency) for the tier containing `delay`, or None."""
+        index = bisect_right(self.bounds, delay) - 1
+        if index < 0:
+            return None
+        max_delay, amount, currency = self.tiers[index]
+        if max_delay is not None and delay >= max_delay:
+            return None
+        return amount, currency
+
+
+class CompiledRules:
+    """
+    The rule set compiled into per-airline tables.
+    On lookup the first table with a matching tier wins: airline-specific tables are
+    tried before the generic (airline_name NULL) ones, and within each group the most
+    recently effective table comes first, so newer rules override overlapping tiers.
+    """
+
+    def __init__(self, rules, version=None):
+        self.version = version  # Of the compensation_rules dataset the rules were read at
+        self.rules = [dict(rule) for rule in rules]
+        groups = {}
+        for rule in self.rules:
+            key = (rule.get("airline_name"), rule.get("effective_from"), rule.get("effective_to"))
+            groups.setdefault(key, []).append(rule)
+
+        self.tables = {}
+        for (airline_name, effective_from, effective_to), group in groups.items():
+            self.tables.setdefault(airline_name, []).append(
+                RuleTable(airline_name, effective_from, effective_to, group)
+            )
+        for tables in self.tables.values():
+            tables.sort(key=lambda table: table.effective_from or date.min, reverse=True)
+
+    def lookup(self, delay, airline_name=None, on=None):
+        """
+        Find the compensation for a delay.
+        :param delay: Delay in minutes (None counts as no delay).
+        :param airline_name: Operating airline, for airline-specific rules.
+        :param on: Date (or datetime) of the flight; defaults to today.
+        :return: Tuple (amount, currency); amount is 0 if no tier matches.
+        """
+        delay = delay or 0
+        if on is None:
+            on = date.today()
+        elif isinstance(on, datetime):
+            on = on.date()
+
+        candidates = self.tables.get(airline_name, []) if airline_name else []
+        for tables in (candidates, self.tables.get(None, [])):
+            for table in tables:
+                if table.applies_on(on):
+                    match = table.lookup(delay)
+                    if match:
+                        return match
+        return 0, "TND"
+
+    def active_rules(self, on=None):
+        """Rules in effect on the given date (default today), ordered for display."""
+        on = on or date.today()
+        active = [rule for rule in self.rules
+                  if (rule.get("effective_from") is None or rule["effective_from"] <= on) and
+                  (rule.get("effective_to") is None or on <= rule["effective_to"])]
+        return sorted(active, key=lambda rule: (rule.get("airline_name") or "", rule["min_delay"]))
+
+
+def tiers_overlap(first, second):
+    """Whether two [min_delay, max_delay) tiers share a delay (max_delay None is unbounded)."""
+    return ((second["max_delay"] is None or first["min_delay"] < second["max_delay"]) and
+            (first["max_delay"] is None or second["min_delay"] < first["max_delay"]))
+
+
+def find_overlapping_rule(rule_data, exclude_id=None):
+    """
+    The stored rule of the same airline and effective period whose tier overlaps
+    `rule_data`, or None. A RuleTable bisects on min_delay, so overlapping tiers in
+    one table would hide each other.
+    :param exclude_id: Id of the rule being updated.
+    """
+    query = CompensationRule.query.filter(
+        CompensationRule.airline_name.is_not_distinct_from(rule_data.get("airline_name")),
+        CompensationRule.effective_from.is_not_distinct_from(rule_data.get("effective_from")),
+        CompensationRule.effective_to.is_not_distinct_from(rule_data.get("effective_to")),
+    )
+    if exclude_id is not None:
+        query = query.filter(CompensationRule.id != exclude_id)
+    candidate = {"min_delay": rule_data["min_delay"], "max_delay": rule_data.get("max_delay")}
+    for rule in query:
+        if tiers_overlap(candidate, {"min_delay": rule.min_delay, "max_delay": rule.max_delay}):
+            return rule
+    return None
+
+
+_lock = threading.Lock()
+_compiled = None
+
+
+def load_rules():
+    """Read the rule set from the database."""
+    rules = [rule.to_dict() for rule in CompensationRule.query.all()]
+    for rule in rules:
+        for name in ("effective_from", "effective_to"):
+            if rule[name]:
+                rule[name] = date.fromisoformat(rule[name])
+    return rules
+
+
+def get_compiled_rules():
+    """
+    Return the compiled rule set, compiling it again when the compensation_rules version
+    moved. The version is read from sync_state on every call, so a change made by any
+    process is used by the next lookup.
+    """
+    global _compiled
+    version, _modified_at = dataset_version(COMPENSATION_RULES_DATASET)
+    compiled = _compiled
+    if compiled is not None and compiled.version == version:
+        return compiled
+
+    with _lock:
+        if _compiled is None or _compiled.version != version:
+            _compiled = CompiledRules(load_rules(), version)
+        return _compiled
+
+
+def invalidate_rules():
+    """
+    Drop the cached rules response; call after any change to compensation_rules, whose
+    transaction bumps the COMPENSATION_RULES_DATASET version (which retires the compiled rules).
+    """
+    invalidate_compensation_rules()
@@ -5,12 +5,89 @@ from dotenv import load_dotenv  # Import load_dotenv
 load_dotenv()
 
 class Config:
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///flights.db'  # SQLite database for simplicity
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///flights.db')  # PostgreSQL in production
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # Explicit overrides; the rest is built by app/database.py
+
+    # Connection pool of server databases (PostgreSQL); ignored for SQLite
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))  # Reconnect connections older than this (seconds)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'  # Test connections on checkout
+
+    # Pragmas applied to every SQLite connection. WAL lets readers run while the ingestion job writes.
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')  # Safe with WAL, fewer fsyncs than FULL
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # Pages, or KiB when negative (64 MB)
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 268435456))  # Bytes of the file to memory-map (256 MB)
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))  # Milliseconds to wait on a locked database
+
+    # Caching configuration, see app/cache_backends.py
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')  # "lru", "filesystem", "redis" or "tiered"
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))  # Cache timeout in seconds
+    CACHE_LRU_MAX_ENTRIES = int(os.environ.get('CACHE_LRU_MAX_ENTRIES', 10000))  # Size bound of the in-process cache
+    CACHE_SHARED_BACKEND = os.environ.get('CACHE_SHARED_BACKEND', 'filesystem')  # Level 2 of "tiered"
+    CACHE_L1_TIMEOUT = int(os.environ.get('CACHE_L1_TIMEOUT', 5))  # Max seconds an entry lives in level 1 of "tiered"
+    CACHE_DIR = os.environ.get('CACHE_DIR')  # Defaults to instance/cache
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+
+    # Flight ingestion: /api/flights only reads the local database, a background
+    # job (in-process scheduler or `flask ingest-flights`) keeps it up to date.
+    FLIGHT_SCHEDULER_ENABLED = os.environ.get('FLIGHT_SCHEDULER_ENABLED', 'false').lower() == 'true'
+    FLIGHT_REFRESH_INTERVAL = int(os.environ.get('FLIGHT_REFRESH_INTERVAL', 900))  # Seconds between refreshes
+    INGEST_LOCK_FILE = os.environ.get('INGEST_LOCK_FILE')  # Defaults to instance/ingestion.lock; one refresh at a time per host
+
+    # Upstream flight data, see app/flight_fetcher.py
+    AVIATIONSTACK_API_KEY = os.environ.get('AVIATIONSTACK_API_KEY')
+    AVIATIONSTACK_BASE_URL = os.environ.get('AVIATIONSTACK_BASE_URL', 'https://api.aviationstack.com/v1')
+    INGEST_AIRPORTS = os.environ.get('INGEST_AIRPORTS', 'TUN')  # Comma-separated IATA codes
+    INGEST_DIRECTIONS = os.environ.get('INGEST_DIRECTIONS', 'dep,arr')  # Departures and/or arrivals
+    INGEST_PAGE_LIMIT = int(os.environ.get('INGEST_PAGE_LIMIT', 100))  # Flights per upstream page
+    INGEST_CONCURRENCY = int(os.environ.get('INGEST_CONCURRENCY', 4))  # Upstream requests in flight at once
+    INGEST_MAX_PAGES = int(os.environ.get('INGEST_MAX_PAGES', 0))  # Pages per airport and direction, 0 for all
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 500))  # Flights parsed and saved per batch
+
+    # Upstream HTTP client, see app/upstream.py
+    UPSTREAM_CONNECT_TIMEOUT = float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 5))  # Seconds
+    UPSTREAM_READ_TIMEOUT = float(os.environ.get('UPSTREAM_READ_TIMEOUT', 30))  # Seconds
+    UPSTREAM_MAX_RETRIES = int(os.environ.get('UPSTREAM_MAX_RETRIES', 3))  # Retries on 429, 5xx and network errors
+    UPSTREAM_BACKOFF_BASE = float(os.environ.get('UPSTREAM_BACKOFF_BASE', 0.5))  # Seconds, doubled per retry
+    UPSTREAM_BACKOFF_MAX = float(os.environ.get('UPSTREAM_BACKOFF_MAX', 10))  # Cap of one backoff (seconds)
+    UPSTREAM_BREAKER_THRESHOLD = int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', 5))  # Failed calls that open the circuit
+    UPSTREAM_BREAKER_RESET = int(os.environ.get('UPSTREAM_BREAKER_RESET', 60))  # Seconds before trying again
+
+    # Raw upstream responses kept on disk, see app/upstream_cache.py
+    UPSTREAM_CACHE_ENABLED = os.environ.get('UPSTREAM_CACHE_ENABLED', 'true').lower() == 'true'
+    UPSTREAM_CACHE_DIR = os.environ.get('UPSTREAM_CACHE_DIR')  # Defaults to instance/upstream_cache
+    UPSTREAM_CACHE_TTL = int(os.environ.get('UPSTREAM_CACHE_TTL', 300))  # Seconds a snapshot is used without refetching
+
+    # In-process read model of the flights for lookups by flight_number, see app/flight_snapshot.py
+    FLIGHT_SNAPSHOT_ENABLED = os.environ.get('FLIGHT_SNAPSHOT_ENABLED', 'false').lower() == 'true'
+    # Milliseconds between two reads of the flights version; writes by other processes show up within it
+    FLIGHT_SNAPSHOT_MAX_AGE_MS = int(os.environ.get('FLIGHT_SNAPSHOT_MAX_AGE_MS', 1000))
+
+    # Most claims accepted by one POST /api/claims/bulk
+    CLAIMS_BULK_MAX = int(os.environ.get('CLAIMS_BULK_MAX', 500))
+
+    # Lifetimes of the tokens issued by /admin/login and /admin/token/refresh (seconds)
+    JWT_ACCESS_TOKEN_TTL = int(os.environ.get('JWT_ACCESS_TOKEN_TTL', 3600))
+    JWT_REFRESH_TOKEN_TTL = int(os.environ.get('JWT_REFRESH_TOKEN_TTL', 30 * 24 * 3600))
+
+    # Claims of verified admin tokens are reused for this many seconds (never past exp), see app/token_cache.py
+    JWT_VERIFIED_CACHE_TTL = int(os.environ.get('JWT_VERIFIED_CACHE_TTL', 300))  # 0 verifies every request
+    JWT_VERIFIED_CACHE_SIZE = int(os.environ.get('JWT_VERIFIED_CACHE_SIZE', 1024))  # Tokens kept per worker
+
+    # Admin login, see app/passwords.py and app/rate_limit.py. Hashes made with another
+    # method or cost are replaced on the next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')  # e.g. "scrypt:32768:8:1", "pbkdf2:sha256:600000"
+    LOGIN_HASH_WORKERS = int(os.environ.get('LOGIN_HASH_WORKERS', 2))  # Threads hashing passwords, per worker process
+    LOGIN_HASH_QUEUE = int(os.environ.get('LOGIN_HASH_QUEUE', 16))  # Logins that may wait for a hashing thread
+    LOGIN_HASH_TIMEOUT = float(os.environ.get('LOGIN_HASH_TIMEOUT', 10))  # Seconds a login waits for its hash
+    LOGIN_RATE_WINDOW = int(os.environ.get('LOGIN_RATE_WINDOW', 60))  # Seconds per rate limit window
+    LOGIN_MAX_ATTEMPTS_PER_IP = int(os.environ.get('LOGIN_MAX_ATTEMPTS_PER_IP', 30))  # Per window, 0 for no limit
+    LOGIN_MAX_FAILURES_PER_USERNAME = int(os.environ.get('LOGIN_MAX_FAILURES_PER_USERNAME', 5))  # Per window, 0 for no limit
 
-    # Caching configuration (if you need caching)
-    CACHE_TYPE = "simple"  # This can be "simple", "redis", or other options based on your requirements
-    CACHE_DEFAULT_TIMEOUT = 300  # Cache timeout in seconds (optional)
     SECRET_KEY = os.environ.get('SECRET_KEY')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
 
@@ -0,0 +1,66 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from app.extensions import db
+
+SQLITE_JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SQLITE_SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def configure_engine_options(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS from the DB_* settings before the engine is created.
+    Values already present in SQLALCHEMY_ENGINE_OPTIONS win.
+    """
+    config = app.config
+    options = {}
+    if not is_sqlite(config['SQLALCHEMY_DATABASE_URI']):
+        # SQLite connections are local files; pool sizing and pre-ping only matter for a server
+        options.update(
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+            pool_pre_ping=config['DB_POOL_PRE_PING'],
+        )
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    return options
+
+
+def sqlite_pragmas(config):
+    """The PRAGMA statements to run on every new SQLite connection."""
+    journal_mode = config['SQLITE_JOURNAL_MODE'].upper()
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"SQLITE_JOURNAL_MODE must be one of {sorted(SQLITE_JOURNAL_MODES)}")
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {sorted(SQLITE_SYNCHRONOUS_MODES)}")
+    return [
+        f"PRAGMA journal_mode={journal_mode}",
+        f"PRAGMA synchronous={synchronous}",
+        f"PRAGMA cache_size={int(config['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT'])}",
+    ]
+
+
+def init_database(app):
+    """Apply the SQLite pragmas to every connection of the app's engine (no-op for other databases)."""
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    pragmas = sqlite_pragmas(app.config)
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    with app.app_context():
+        event.listen(db.engine, 'connect', apply_pragmas)
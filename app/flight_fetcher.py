@@ -0,0 +1,277 @@
+import asyncio
+import json
+import httpx
+from app.upstream import UpstreamClient, UpstreamUnavailable
+from app.upstream_cache import SpooledBody, cache_key
+
+try:
+    import ijson
+except ImportError:  # Optional: without it each page body is decoded in one piece
+    ijson = None
+
+DIRECTIONS = ('dep', 'arr')
+
+
+def parse_flight(flight):
+    """Map an AviationStack flight record to the nested dict used by save_flights_to_db."""
+    departure = flight.get('departure') or {}
+    arrival = flight.get('arrival') or {}
+    airline = flight.get('airline') or {}
+
+    return {
+        "flight_date": flight.get('flight_date', 'Unknown'),
+        "flight_status": flight.get('flight_status', 'Unknown'),
+        "flight_number": (flight.get('flight') or {}).get('iata', 'Unknown'),
+        "airline_name": airline.get('name', 'Unknown'),
+        "departure": {
+            "airport": departure.get('airport', 'Unknown'),
+            "timezone": departure.get('timezone', 'Unknown'),
+            "iata": departure.get('iata', 'Unknown'),
+            "delay": departure.get('delay', 0.0),  # Default to 0 if missing
+            "scheduled": departure.get('scheduled', None),
+            "actual": departure.get('actual', None),
+        },
+        "arrival": {
+            "airport": arrival.get('airport', 'Unknown'),
+            "timezone": arrival.get('timezone', 'Unknown'),
+            "iata": arrival.get('iata', 'Unknown'),
+            "scheduled": arrival.get('scheduled', None),
+            "actual": arrival.get('actual', None),
+        },
+    }
+
+
+def scan_payload(f):
+    """
+    First pass over a page body: return the pagination total (or the number of
+    records when there is none). Raises ValueError for a body without 'data'.
+    """
+    if ijson is None:
+        payload = json.load(f)
+        if 'data' not in payload:
+            raise ValueError(f"'data' not found in response: {payload}")
+        return (payload.get('pagination') or {}).get('total', len(payload['data'] or []))
+
+    total, records, has_data = None, 0, False
+    for prefix, event, value in ijson.parse(f):
+        if prefix == 'pagination.total' and event == 'number':
+            total = int(value)
+        elif prefix == '' and event == 'map_key' and value == 'data':
+            has_data = True
+        elif prefix == 'data.item' and event == 'start_map':
+            records += 1
+    if not has_data:
+        # AviationStack reports some errors (e.g. quota) in a 200 body without 'data'
+        f.seek(0)
+        raise ValueError(f"'data' not found in response: {f.read(1000)!r}")
+    return records if total is None else total
+
+
+def iter_records(f):
+    """Yield the raw flight records of a page body one at a time."""
+    if ijson is None:
+        yield from json.load(f)['data'] or []
+    else:
+        yield from ijson.items(f, 'data.item', use_float=True)
+
+
+class UpstreamPage:
+    """A downloaded page, spooled and parsed lazily, one batch of flights at a time."""
+
+    def __init__(self, body, store=None):
+        self.body = body
+        self._store = store
+
+    def batches(self, size):
+        """Yield lists of at most `size` parsed flights; only one batch is alive at a time."""
+        batch = []
+        for record in iter_records(self.body.rewind()):
+            batch.append(parse_flight(record))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def store(self):
+        """Keep the body as the snapshot of its request (after every batch was saved)."""
+        if self._store is not None:
+            self._store()
+
+    def close(self):
+        self.body.close()
+
+
+class FlightFetcher:
+    """
+    Fetches flights from AviationStack for several airports, as departures and/or arrivals.
+    Each (airport, direction) query is walked with offset/limit pagination. Pages are
+    requested concurrently, at most `concurrency` at a time, and handed over as they arrive.
+    Timeouts, retries and the circuit breaker are the UpstreamClient's job.
+
+    With a ResponseCache, a page whose snapshot is younger than its TTL is not requested,
+    and a page whose body hashes like the stored snapshot is not parsed nor handed over:
+    both were saved by an earlier run. `force` ignores the stored snapshots.
+
+    Bodies are streamed to a spool file and parsed incrementally, so memory holds one
+    batch of `batch_size` flights per page being saved, whatever the page size.
+    """
+
+    def __init__(self, upstream, api_key, airports, directions=DIRECTIONS, page_limit=100,
+                 concurrency=4, max_pages=None, transport=None, cache=None, force=False, batch_size=500):
+        unknown = set(directions) - set(DIRECTIONS)
+        if unknown:
+            raise ValueError(f"Unknown directions {sorted(unknown)}, use {DIRECTIONS}")
+        self.upstream = upstream
+        self.api_key = api_key
+        self.airports = [airport.strip().upper() for airport in airports if airport.strip()]
+        self.directions = tuple(directions)
+        self.page_limit = page_limit
+        self.concurrency = concurrency
+        self.max_pages = max_pages or None
+        self.transport = transport  # httpx transport override, e.g. ReplayTransport
+        self.cache = cache
+        self.force = force
+        self.batch_size = batch_size
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.pages = 0
+        self.failed_pages = 0
+        self.cached_pages = 0  # Snapshot still fresh, not requested
+        self.unchanged_pages = 0  # Requested, same body as the snapshot
+
+    @classmethod
+    def from_config(cls, config, upstream=None, **overrides):
+        """Build a fetcher from the AVIATIONSTACK_* and INGEST_* settings."""
+        options = dict(
+            upstream=upstream or UpstreamClient.from_config(config),
+            api_key=config['AVIATIONSTACK_API_KEY'],
+            airports=config['INGEST_AIRPORTS'].split(','),
+            directions=[d.strip() for d in config['INGEST_DIRECTIONS'].split(',') if d.strip()],
+            page_limit=config['INGEST_PAGE_LIMIT'],
+            concurrency=config['INGEST_CONCURRENCY'],
+            max_pages=config['INGEST_MAX_PAGES'],
+            batch_size=config['INGEST_BATCH_SIZE'],
+        )
+        options.update(overrides)
+        return cls(**options)
+
+    async def _fetch_page(self, client, semaphore, airport, direction, offset):
+        """
+        Fetch one page.
+        :return: (page, total): the UpstreamPage (None when the stored snapshot made it
+                 unnecessary) and the total number of flights of the query.
+        """
+        params = {
+            'access_key': self.api_key,
+            f'{direction}_iata': airport,
+            'limit': self.page_limit,
+            'offset': offset,
+        }
+        key = meta = None
+        if self.cache is not None:
+            key = cache_key('/flights', params)
+            meta = None if self.force else self.cache.lookup(key)
+            if meta and self.cache.is_fresh(meta):
+                self.cached_pages += 1
+                return None, meta['total']
+
+        body = SpooledBody()
+        try:
+            async with semaphore:
+                await self.upstream.get(client, '/flights', params, sink=body)
+
+            if meta and meta['hash'] == body.hexdigest:
+                # Same bytes as the saved snapshot: skip parsing, conversion and saving
+                self.cache.touch(key, meta)
+                self.unchanged_pages += 1
+                body.close()
+                return None, meta['total']
+
+            total = scan_payload(body.rewind())
+        except BaseException:
+            body.close()
+            raise
+
+        store = None
+        if self.cache is not None:
+            def store():
+                self.cache.store(key, '/flights', params, body, total)
+        return UpstreamPage(body, store), total
+
+    def _page_failed(self, airport, direction, offset, error):
+        self.failed_pages += 1
+        print(f"Error fetching {direction}_iata={airport} offset={offset}: {error}")
+        return None
+
+    async def _walk(self, client, semaphore, queue, airport, direction):
+        """Fetch every page of one query, putting each page on the queue as it arrives."""
+        async def fetch(offset):
+            try:
+                page, total = await self._fetch_page(client, semaphore, airport, direction, offset)
+            except httpx.HTTPStatusError as e:
+                # Not str(e): it contains the URL, access key included
+                return self._page_failed(airport, direction, offset, f"HTTP {e.response.status_code}")
+            except (httpx.HTTPError, UpstreamUnavailable, ValueError) as e:
+                return self._page_failed(airport, direction, offset, e)
+            self.pages += 1
+            if page is not None:
+                await queue.put(page)
+            return total
+
+        # The first page tells how many more there are
+        total = await fetch(0)
+        if total is None:
+            return
+        offsets = range(self.page_limit, total, self.page_limit)
+        if self.max_pages:
+            offsets = offsets[:self.max_pages - 1]
+        await asyncio.gather(*(fetch(offset) for offset in offsets))
+
+    async def iter_pages(self):
+        """
+        Yield batches of parsed flights, pages in arrival order.
+        A page's snapshot is stored once the consumer has asked for the batch after its
+        last one, i.e. only after it dealt with every batch of the page without raising.
+        """
+        queue = asyncio.Queue()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        done = object()
+
+        # One keep-alive connection per concurrent request, reused for every page
+        async with self.upstream.connect(self.concurrency, self.transport) as client:
+            async def produce():
+                try:
+                    await asyncio.gather(*(
+                        self._walk(client, semaphore, queue, airport, direction)
+                        for airport in self.airports for direction in self.directions
+                    ))
+                finally:
+                    await queue.put(done)
+
+            producer = asyncio.create_task(produce())
+            try:
+                while (page := await queue.get()) is not done:
+                    try:
+                        for batch in page.batches(self.batch_size):
+                            yield batch
+                        page.store()
+                    finally:
+                        page.close()
+            finally:
+                producer.cancel()
+                await asyncio.gather(producer, return_exceptions=True)
+
+    async def _consume(self, on_page):
+        async for page in self.iter_pages():
+            on_page(page)
+
+    def run(self, on_page):
+        """
+        Fetch every page, calling on_page(flights) for each batch as it arrives.
+        :return: True if every page was fetched, False if some failed.
+        """
+        self._reset_counters()
+        asyncio.run(self._consume(on_page))
+        return self.failed_pages == 0
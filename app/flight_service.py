@@ -1,150 +1,128 @@
-import os
-import requests
 from dotenv import load_dotenv
-from app.models import Flight, db, create_simplified_flight_response
+from sqlalchemy import select, insert, update, or_
+from app.models import Flight, SyncState, FLIGHTS_DATASET, db
+from app.timestamps import TimestampParser
 from datetime import datetime
 
 # Load environment variables
 load_dotenv()
 
-def fetch_tunis_flights(skip_saving=False):
+
+def _chunks(items, size):
+    """Split a list into consecutive chunks of at most `size` items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def flight_to_row(flight_data, timestamps):
     """
-    Fetch flights from Tunis-Carthage Airport (TUN).
-    Optionally skip saving the results to the database.
+    Flatten a fetched flight (nested departure/arrival dicts) into Flight column values.
+    Timestamps are stored as naive UTC, so they compare equal to what SQLite hands back.
+    :param timestamps: The TimestampParser of the batch.
     """
-    api_key = os.getenv("AVIATIONSTACK_API_KEY")
-    if not api_key:
-        print("API key is missing.")
-        return None
+    departure = flight_data.get('departure') or {}
+    arrival = flight_data.get('arrival') or {}
+    airline_name = flight_data.get('airline_name') or (flight_data.get('airline') or {}).get('name', 'Unknown')
+
+    return {
+        "flight_number": flight_data.get('flight_number'),
+        "flight_date": timestamps.parse_naive(flight_data.get('flight_date')),
+        "flight_status": flight_data.get('flight_status', 'Unknown'),
+        "departure_airport": departure.get('airport', 'Unknown'),
+        "departure_timezone": departure.get('timezone', 'Unknown'),
+        "departure_iata": departure.get('iata', 'Unknown'),
+        "departure_delay": departure.get('delay', 0.0),
+        "departure_scheduled": timestamps.parse_naive(departure.get('scheduled')),
+        "departure_actual": timestamps.parse_naive(departure.get('actual')),
+        "arrival_airport": arrival.get('airport', 'Unknown'),
+        "arrival_timezone": arrival.get('timezone', 'Unknown'),
+        "arrival_iata": arrival.get('iata', 'Unknown'),
+        "arrival_scheduled": timestamps.parse_naive(arrival.get('scheduled')),
+        "arrival_actual": timestamps.parse_naive(arrival.get('actual')),
+        "airline_name": airline_name,
+    }
+
+
+SAVE_CHUNK_SIZE = 500  # Rows per multi-row statement; keeps SQLite under its bound-parameter limit
+
+
+def save_flights_to_db(flights, chunk_size=SAVE_CHUNK_SIZE):
+    """
+    Merge a batch of fetched flights into the database in a single transaction.
+    Flights are matched on their natural key, (flight_number, flight_date). Each record
+    is fingerprinted; existing fingerprints are loaded with one IN query per chunk of
+    flight numbers, new flights are inserted and only flights whose fingerprint changed
+    are updated, with multi-row statements. Written rows get a fresh last_modified.
+    :return: Dict with the number of inserted, updated and unchanged flights, plus
+             the flight numbers that were written ("changed").
+    """
+    result = {"inserted": 0, "updated": 0, "unchanged": 0, "changed": []}
 
-    url = f"https://api.aviationstack.com/v1/flights?access_key={api_key}&dep_iata=TUN"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for 4xx/5xx responses
-        print(f"Response Status Code: {response.status_code}")  # Log status code
-
-        # Check if response contains the expected 'data' field
-        data = response.json()
-        if 'data' not in data:
-            print(f"Error: 'data' not found in response: {data}")
-            return None
-
-        flights_data = data['data']
-        if not flights_data:
-            print("No flight data found.")
-            return None
-
-        flights = []
-        for flight in flights_data:
-            flight_number = flight.get('flight', {}).get('iata', 'Unknown')
-            flight_status = flight.get('flight_status', 'Unknown')
-            flight_date = flight.get('flight_date', 'Unknown')
-
-            # Departure details
-            departure = flight.get('departure', {})
-            departure_airport = departure.get('airport', 'Unknown')
-            departure_timezone = departure.get('timezone', 'Unknown')
-            departure_iata = departure.get('iata', 'Unknown')
-            departure_delay = departure.get('delay', 0.0)  # Default to 0 if missing
-            departure_scheduled = departure.get('scheduled', None)
-            departure_actual = departure.get('actual', None)
-
-            # Arrival details
-            arrival = flight.get('arrival', {})
-            arrival_airport = arrival.get('airport', 'Unknown')
-            arrival_timezone = arrival.get('timezone', 'Unknown')
-            arrival_iata = arrival.get('iata', 'Unknown')
-            arrival_scheduled = arrival.get('scheduled', None)
-            arrival_actual = arrival.get('actual', None)
-
-            # Airline details
-            airline = flight.get('airline', {})
-            airline_name = airline.get('name', 'Unknown')
-
-            flight_info = {
-                "flight_date": flight_date,
-                "flight_status": flight_status,
-                "flight_number": flight_number,
-                "airline_name": airline_name,
-                "departure": {
-                    "airport": departure_airport,
-                    "timezone": departure_timezone,
-                    "iata": departure_iata,
-                    "delay": departure_delay,  # Ensure delay is included
-                    "scheduled": departure_scheduled,
-                    "actual": departure_actual,
-                },
-                "arrival": {
-                    "airport": arrival_airport,
-                    "timezone": arrival_timezone,
-                    "iata": arrival_iata,
-                    "scheduled": arrival_scheduled,
-                    "actual": arrival_actual,
-                },
-            }
-            flights.append(flight_info)
-
-        if not skip_saving:
-            save_flights_to_db(flights)
-
-        # Fetch the saved flights from the database and simplify the response
-        saved_flights = Flight.query.all()
-        simplified_flights = [create_simplified_flight_response(flight) for flight in saved_flights]
-        return simplified_flights
-
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching flight data: {e}")
-        return None
-
-
-def format_datetime(dt):
-    """Format a datetime object to the required string format."""
-    if dt:
-        return dt.strftime("%Y-%m-%dT%H:%M:%S+00:00")
-    return None
-
-
-def save_flights_to_db(flights):
+    # Deduplicate the batch by natural key; the last record wins
+    rows = {}
+    timestamps = TimestampParser()  # Scheduled times and dates repeat a lot within a batch
     for flight_data in flights:
-        # Extract and handle missing flight_number
         flight_number = flight_data.get('flight_number')
         if not flight_number:
             print(f"Missing flight_number, skipping flight: {flight_data}")
             continue  # Skip if flight_number is missing
+        row = flight_to_row(flight_data, timestamps)
+        row["fingerprint"] = Flight.compute_fingerprint(row)
+        rows[(flight_number, row["flight_date"])] = row
+    timestamps.flush()
+
+    if not rows:
+        return result
+
+    # Load the stored fingerprint of every flight in the batch; the days of the batch
+    # bound the rows read, however much history a flight number has
+    dates = {flight_date for _flight_number, flight_date in rows}
+    same_day = Flight.flight_date.in_(dates - {None})
+    if None in dates:
+        same_day = or_(same_day, Flight.flight_date.is_(None))
+    existing = {}
+    for numbers in _chunks(list({flight_number for flight_number, _flight_date in rows}), chunk_size):
+        query = select(Flight.id, Flight.flight_number, Flight.flight_date, Flight.fingerprint).where(
+            Flight.flight_number.in_(numbers), same_day)
+        for stored in db.session.execute(query):
+            existing[(stored.flight_number, stored.flight_date)] = stored
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for key, row in rows.items():
+        stored = existing.get(key)
+        if stored is None:
+            inserts.append({**row, "last_modified": now})
+        elif stored.fingerprint != row["fingerprint"]:
+            updates.append({"id": stored.id, **row, "last_modified": now})
+        else:
+            result["unchanged"] += 1
 
-        # Convert datetime fields
-        flight_date = Flight.convert_to_datetime(flight_data.get('flight_date'))
-        departure_scheduled = Flight.convert_to_datetime(flight_data.get('departure', {}).get('scheduled'))
-        departure_actual = Flight.convert_to_datetime(flight_data.get('departure', {}).get('actual'))
-        arrival_scheduled = Flight.convert_to_datetime(flight_data.get('arrival', {}).get('scheduled'))
-        arrival_actual = Flight.convert_to_datetime(flight_data.get('arrival', {}).get('actual'))
-
-        # If the flight already exists in the DB, skip it
-        existing_flight = Flight.query.filter_by(flight_number=flight_number).first()
-        if existing_flight:
-            print(f"Flight {flight_number} already exists, skipping.")
-            continue
-
-        # Insert the flight into the database
-        new_flight = Flight(
-            flight_number=flight_number,
-            flight_date=flight_date,
-            flight_status=flight_data.get('flight_status', 'Unknown'),
-            departure_airport=flight_data.get('departure', {}).get('airport', 'Unknown'),
-            departure_timezone=flight_data.get('departure', {}).get('timezone', 'Unknown'),
-            departure_iata=flight_data.get('departure', {}).get('iata', 'Unknown'),
-            departure_delay=flight_data.get('departure', {}).get('delay', 0.0),  # Ensure delay is included
-            departure_scheduled=departure_scheduled,
-            departure_actual=departure_actual,
-            arrival_airport=flight_data.get('arrival', {}).get('airport', 'Unknown'),
-            arrival_timezone=flight_data.get('arrival', {}).get('timezone', 'Unknown'),
-            arrival_iata=flight_data.get('arrival', {}).get('iata', 'Unknown'),
-            arrival_scheduled=arrival_scheduled,
-            arrival_actual=arrival_actual,
-            airline_name=flight_data.get('airline', {}).get('name', 'Unknown')
-        )
-        
-        # Add and commit to the database
-        db.session.add(new_flight)
+    try:
+        for chunk in _chunks(inserts, chunk_size):
+            db.session.execute(insert(Flight), chunk)
+        for chunk in _chunks(updates, chunk_size):
+            db.session.execute(update(Flight), chunk)
+        if inserts or updates:
+            SyncState.bump_version(FLIGHTS_DATASET, now)
         db.session.commit()
-        print(f"Flight {flight_number} added to the database.")
\ No newline at end of file
+    except Exception:
+        db.session.rollback()
+        raise
+
+    result["inserted"] = len(inserts)
+    result["updated"] = len(updates)
+    result["changed"] = [row["flight_number"] for row in inserts + updates]
+    print(f"Saved flights: {result['inserted']} inserted, {result['updated']} updated, {result['unchanged']} unchanged.")
+    return result
+
+
+def get_flights_modified_since(since):
+    """
+    Query for flights whose data changed after `since` (a naive UTC datetime, or None
+    for every flight). Lets downstream consumers process only what the last ingestion touched.
+    """
+    query = Flight.query
+    if since is not None:
+        query = query.filter(Flight.last_modified > since)
+    return query.order_by(Flight.last_modified)
@@ -0,0 +1,241 @@
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import Flight, FLIGHTS_DATASET
+from app.caching import dataset_version
+from app.serializers import FLIGHT_FIELDS, FLIGHT_COLUMNS, flight_values
+
+# Rows whose last_modified is this much older than the newest row seen are re-read on
+# every incremental sync: a writer stamps last_modified before its transaction commits.
+SYNC_OVERLAP = timedelta(minutes=5)
+
+POOLED_TYPES = (str, datetime)  # Immutable values stored once however many flights share them
+
+
+def _day_order(record):
+    """Sort key of the days of one flight number: a missing flight_date first, the latest day last."""
+    return record.flight_date is not None, record.flight_date or datetime.min, record.id
+
+
+def latest_flight_query(flight_number):
+    """SELECT of FLIGHT_COLUMNS by flight number, latest day first: an index seek on the natural key."""
+    return (select(*FLIGHT_COLUMNS).where(Flight.flight_number == flight_number)
+            .order_by(Flight.flight_date.desc().nulls_last(), Flight.id.desc()))
+
+
+class FlightRecord:
+    """
+    One flight of the snapshot: the FLIGHT_FIELDS values as slots, no ORM state.
+    Iterates in FLIGHT_FIELDS order, so serialize_flight() takes it like a row.
+    """
+    __slots__ = FLIGHT_FIELDS
+
+    def __iter__(self):
+        return iter(flight_values(self))
+
+
+class FlightSnapshot:
+    """
+    Read model of the flights table for the lookups by flight_number: a FlightRecord
+    per row, by id, and an index of the latest day of each flight number. Repeated
+    strings and timestamps (airports, statuses, dates, times on the hour) are shared
+    between records.
+    sync() catches up with the flights dataset version: changed rows are re-read by
+    last_modified, and a row count that no longer matches (deletes), or a record that
+    leaves the latest day of its number (renames, earlier dates), triggers a full
+    reload. The version is read at most once per `max_age` seconds, so most lookups
+    are a dict probe; expire() makes the next sync() read it.
+    """
+
+    def __init__(self, max_age=1.0):
+        self.records = {}
+        self.index = {}
+        self.version = None
+        self.max_age = max_age
+        self.checked_at = None  # time.monotonic() of the last version read
+        self.watermark = None  # Newest last_modified loaded
+        self.full_loads = 0
+        self.incremental_loads = 0
+        self.synced_at = None
+        self._pool = {}
+        self._lock = threading.Lock()
+
+    def _record(self, row):
+        record = FlightRecord()
+        pool = self._pool
+        for name, value in zip(FLIGHT_FIELDS, row):
+            if type(value) in POOLED_TYPES:
+                value = pool.setdefault(value, value)
+            setattr(record, name, value)
+        return record
+
+    def _load(self, records, index, since=None):
+        """
+        Read the rows changed since `since` (all rows if None) into `records` and
+        `index`, keeping the latest day of each flight number in the index.
+        :return: False if a record left the latest day of its flight number, which
+                 only a full reload can resolve.
+        """
+        query = select(*FLIGHT_COLUMNS, Flight.last_modified)
+        if since is not None:
+            query = query.where(Flight.last_modified >= since - SYNC_OVERLAP)
+        consistent = True
+        for row in db.session.execute(query):
+            record = self._record(row[:-1])
+            previous = records.get(record.id)
+            records[record.id] = record
+            current = index.get(record.flight_number)
+            if current is None or _day_order(record) >= _day_order(current):
+                index[record.flight_number] = record
+            if previous is not None and index.get(previous.flight_number) is previous:
+                consistent = False  # Renamed or moved to an earlier day: another row may now be the latest
+            if row.last_modified and (self.watermark is None or row.last_modified > self.watermark):
+                self.watermark = row.last_modified
+        return consistent
+
+    def _reload(self):
+        self._pool = {}
+        self.watermark = None
+        records, index = {}, {}
+        self._load(records, index)
+        self.records, self.index = records, index
+        self.full_loads += 1
+
+    def sync(self):
+        """Bring the snapshot up to the current flights version; cheap when nothing changed."""
+        now = time.monotonic()
+        checked_at = self.checked_at
+        if checked_at is not None and now - checked_at < self.max_age:
+            return
+        version, _modified_at = dataset_version(FLIGHTS_DATASET)
+        if version == self.version:
+            self.checked_at = now
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            if self.version is None or self.watermark is None:
+                self._reload()
+            else:
+                consistent = self._load(self.records, self.index, self.watermark)
+                self.incremental_loads += 1
+                if not consistent or len(self.records) != db.session.scalar(select(func.count(Flight.id))):
+                    self._reload()  # Something was deleted, renamed or moved to an earlier day
+            self.version = version
+            self.synced_at = time.time()
+            self.checked_at = now
+
+    def expire(self):
+        """Read the flights version on the next sync(): this process has just written flights."""
+        self.checked_at = None
+
+    def get(self, flight_number):
+        return self.index.get(flight_number)
+
+    def memory_usage(self):
+        """Approximate bytes held: the dicts, the records and their values (pooled ones once)."""
+        records = self.records
+        size = sys.getsizeof(records) + sys.getsizeof(self.index)
+        size += sum(sys.getsizeof(value) for value in self._pool.values())
+        for record in records.values():
+            size += sys.getsizeof(record)
+            for value in flight_values(record):
+                if value is not None and type(value) not in POOLED_TYPES:
+                    size += sys.getsizeof(value)
+        return size
+
+    def as_dict(self):
+        with self._lock:  # No sync may resize the records while they are walked
+            flights = len(self.records)
+            size = self.memory_usage()
+        return {
+            "flights": flights,
+            "version": self.version,
+            "full_loads": self.full_loads,
+            "incremental_loads": self.incremental_loads,
+            "bytes": size,
+            "bytes_per_100k_flights": round(size / flights * 100000) if flights else None,
+        }
+
+
+def get_flight_snapshot(app):
+    """The app's FlightSnapshot, or None when FLIGHT_SNAPSHOT_ENABLED is off."""
+    if not app.config['FLIGHT_SNAPSHOT_ENABLED']:
+        return None
+    snapshot = app.extensions.get('flight_snapshot')
+    if snapshot is None:
+        snapshot = app.extensions.setdefault(
+            'flight_snapshot', FlightSnapshot(app.config['FLIGHT_SNAPSHOT_MAX_AGE_MS'] / 1000))
+    return snapshot
+
+
+def expire_flight_snapshot(app):
+    """Call after committing flight writes, so this process's next lookup sees them."""
+    snapshot = get_flight_snapshot(app)
+    if snapshot is not None:
+        snapshot.expire()
+
+
+def init_flight_snapshot(app):
+    """Build the snapshot at startup; if the database is not ready yet, the first lookup builds it."""
+    snapshot = get_flight_snapshot(app)
+    if snapshot is None:
+        return
+    with app.app_context():
+        try:
+            snapshot.sync()
+        except SQLAlchemyError as e:
+            print(f"Flight snapshot not built at startup: {e.__class__.__name__}")
+            db.session.rollback()
+
+
+def lookup_flight(app, flight_number, flight_date=None):
+    """
+    Find a flight by flight_number: the given day, or the latest one.
+    :param flight_date: The day of the flight (a naive UTC datetime, as stored); None for the latest.
+    :return: A FlightRecord from the snapshot (or a row of FLIGHT_COLUMNS when the
+             snapshot is disabled or holds another day), None if there is no such
+             flight. Both give the columns as attributes and iterate like a row.
+    """
+    snapshot = get_flight_snapshot(app)
+    if snapshot is not None:
+        snapshot.sync()
+        record = snapshot.get(flight_number)
+        if flight_date is None or (record is not None and record.flight_date == flight_date):
+            return record
+    if flight_date is None:
+        return db.session.execute(latest_flight_query(flight_number)).first()
+    # An earlier day than the snapshot holds
+    return db.session.execute(select(*FLIGHT_COLUMNS).where(
+        Flight.flight_number == flight_number, Flight.flight_date == flight_date)).first()
+
+
+def latest_flight_dates(app, flight_numbers):
+    """
+    {flight_number: flight_date of its latest day} for those of flight_numbers that
+    exist: from the snapshot, or with one grouped IN query without it.
+    """
+    flight_numbers = set(flight_numbers)
+    snapshot = get_flight_snapshot(app)
+    if snapshot is None:
+        if not flight_numbers:
+            return {}
+        return dict(db.session.execute(
+            select(Flight.flight_number, func.max(Flight.flight_date))
+            .where(Flight.flight_number.in_(flight_numbers))
+            .group_by(Flight.flight_number)
+        ).all())
+    snapshot.sync()
+    index = snapshot.index
+    return {number: index[number].flight_date for number in flight_numbers if number in index}
+
+
+def flight_snapshot_stats(app):
+    snapshot = get_flight_snapshot(app)
+    if snapshot is None:
+        return {"enabled": False}
+    return {"enabled": True, **snapshot.as_dict()}
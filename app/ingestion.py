@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+import click
+from datetime import datetime
+from flask import current_app
+from app.extensions import db
+from app.models import SyncState, FLIGHTS_DATASET
+from app.flight_fetcher import FlightFetcher
+from app.upstream import UpstreamClient, get_upstream
+from app.upstream_cache import ResponseCache, ReplayTransport, get_response_cache
+from app.flight_service import save_flights_to_db
+from app.caching import invalidate_flights
+from app.flight_snapshot import get_flight_snapshot, expire_flight_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def refresh_flights(force=False, replay_dir=None):
+    """
+    Pull the latest flights of every INGEST_AIRPORTS airport from AviationStack
+    into the local database. Pages are fetched concurrently and each one is saved
+    as soon as it arrives; pages unchanged since the last run are skipped.
+    Must be called inside an application context.
+    :param force: Ignore the stored upstream snapshots and process every page.
+    :param replay_dir: Replay the snapshots stored in this directory instead of
+                       calling AviationStack (offline runs, tests, benchmarks).
+    :return: True if the refresh succeeded, False otherwise.
+    """
+    config = current_app.config
+
+    def save_page(flights):
+        result = save_flights_to_db(flights)
+        if result["changed"]:
+            invalidate_flights(result["changed"])
+            expire_flight_snapshot(current_app)
+
+    def sync_snapshot():
+        # Catch the in-memory flights up now rather than on the next lookup
+        snapshot = get_flight_snapshot(current_app)
+        if snapshot is not None:
+            snapshot.sync()
+
+    if replay_dir:
+        replay = ReplayTransport(ResponseCache(replay_dir, ttl=0))
+        fetcher = FlightFetcher.from_config(config, UpstreamClient.from_config(config), transport=replay)
+        ok = fetcher.run(save_page)
+        sync_snapshot()
+        return ok
+
+    if not config['AVIATIONSTACK_API_KEY']:
+        print("API key is missing.")
+        return False
+
+    upstream = get_upstream(current_app)
+    if not upstream.breaker.allow():
+        # Keep serving the local data until the circuit lets a probe through
+        print("AviationStack circuit is open, skipping refresh.")
+        return False
+
+    fetcher = FlightFetcher.from_config(config, upstream, cache=get_response_cache(current_app), force=force)
+    ok = fetcher.run(save_page)
+    sync_snapshot()
+    print(f"Fetched {fetcher.pages} pages: {fetcher.cached_pages} from fresh snapshots, "
+          f"{fetcher.unchanged_pages} unchanged, {fetcher.failed_pages} failed.")
+    if not ok:
+        # Pages that did arrive are saved, but the data set is incomplete
+        return False
+
+    refreshed_at = datetime.utcnow()
+    SyncState.mark_refreshed(FLIGHTS_DATASET, refreshed_at)
+    db.session.commit()
+    return True
+
+
+class IngestionLock:
+    """
+    Non-blocking lock on a file, held while a refresh runs. Every worker process may run
+    a scheduler, and `flask ingest-flights` may run next to them: only the holder of
+    the lock refreshes, the others skip their turn. The lock is per host.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        """Take the lock if it is free; returns whether it was taken."""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        lock_file = open(self.path, 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+def get_ingestion_lock(app):
+    """An IngestionLock on INGEST_LOCK_FILE (default instance/ingestion.lock)."""
+    return IngestionLock(app.config['INGEST_LOCK_FILE'] or os.path.join(app.instance_path, 'ingestion.lock'))
+
+
+def refresh_flights_locked(app, **kwargs):
+    """
+    Run refresh_flights(**kwargs) unless another process is refreshing already.
+    :return: True or False as refresh_flights, None if the refresh was skipped.
+    """
+    lock = get_ingestion_lock(app)
+    if not lock.acquire():
+        print("Another process is refreshing flights, skipping this run.")
+        return None
+    try:
+        return refresh_flights(**kwargs)
+    finally:
+        lock.release()
+
+
+class IngestionScheduler:
+    """Background thread that refreshes flights every `interval` seconds."""
+
+    def __init__(self, app, interval):
+        self.app = app
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='flight-ingestion', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            with self.app.app_context():
+                try:
+                    # Another worker's scheduler (or the CLI) may have refreshed meanwhile
+                    last = SyncState.get_last_refreshed(FLIGHTS_DATASET)
+                    if last is None or (datetime.utcnow() - last).total_seconds() >= self.interval:
+                        refresh_flights_locked(self.app)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Flight ingestion failed: {e}")
+                finally:
+                    db.session.remove()
+            self._stop.wait(self.interval)
+
+
+def init_ingestion(app):
+    """
+    Register the `flask ingest-flights` command and, if enabled,
+    start the in-process ingestion scheduler.
+    """
+    @app.cli.command('ingest-flights')
+    @click.option('--loop', is_flag=True, help='Keep refreshing every FLIGHT_REFRESH_INTERVAL seconds.')
+    @click.option('--force', is_flag=True, help='Process every page, even if unchanged since the last run.')
+    @click.option('--replay', type=click.Path(exists=True, file_okay=False),
+                  help='Load the stored upstream snapshots of this directory instead of calling AviationStack.')
+    def ingest_flights_command(loop, force, replay):
+        """Refresh flights from AviationStack into the local database."""
+        while True:
+            ok = refresh_flights_locked(app, force=force, replay_dir=replay)
+            if ok is None:
+                click.echo("Skipped: another process is refreshing flights.")
+            else:
+                click.echo("Flights refreshed." if ok else "Flight refresh failed.")
+            if not loop:
+                break
+            time.sleep(app.config['FLIGHT_REFRESH_INTERVAL'])
+
+    if not app.config['FLIGHT_SCHEDULER_ENABLED']:
+        return None
+
+    # Under the debug reloader only the child process should run the scheduler
+    if app.debug and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return None
+
+    scheduler = IngestionScheduler(app, app.config['FLIGHT_REFRESH_INTERVAL'])
+    scheduler.start()
+    app.extensions['ingestion_scheduler'] = scheduler
+    return scheduler
@@ -1,27 +1,71 @@
 from app import db
 from datetime import datetime
+from flask import current_app
 from marshmallow import Schema, fields
+from sqlalchemy import event
 from app import db
 from werkzeug.security import generate_password_hash, check_password_hash
-from dateutil import parser
+from app.timestamps import parse_timestamp
+import hashlib
+import unicodedata
 
 
 class Admin(db.Model):
     __tablename__ = 'admins'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)  # scrypt hashes are longer than 128
 
-    def set_password(self, password):
-        """Hash the password and store it."""
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, method=None):
+        """Hash the password with PASSWORD_HASH_METHOD (or `method`) and store it."""
+        self.password_hash = generate_password_hash(password, method or current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
         """Check if the provided password matches the hashed password."""
         return check_password_hash(self.password_hash, password)
 
+
+class RefreshToken(db.Model):
+    """
+    A long-lived token an admin trades at /admin/token/refresh for access tokens.
+    Only its SHA-256 is stored; each token is used once, then replaced.
+    """
+    __tablename__ = 'refresh_tokens'
+    id = db.Column(db.Integer, primary_key=True)
+    admin_id = db.Column(db.Integer, nullable=False, index=True)
+    token_hash = db.Column(db.String(64), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+    revoked_at = db.Column(db.DateTime, nullable=True)  # Set when used, or on logout
+
+    @staticmethod
+    def hash_token(token):
+        """The tokens are random, so a plain SHA-256 is enough (no salt or slow hash)."""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+class RevokedToken(db.Model):
+    """An access token refused before its exp (logout), keyed by the token's SHA-256."""
+    __tablename__ = 'revoked_tokens'
+    token_hash = db.Column(db.String(64), primary_key=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)  # The token's exp; NULL if it has none
+
+class RateLimitCounter(db.Model):
+    """Hits of one rate-limited key (e.g. a client IP) in its current fixed window, see app/rate_limit.py."""
+    __tablename__ = 'rate_limit_counters'
+    key = db.Column(db.String(64), primary_key=True)  # SHA-256 of the scope and value
+    window = db.Column(db.Integer, nullable=False)  # Index of the window the count belongs to
+    count = db.Column(db.Integer, nullable=False, default=0)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)  # End of that window
+
 class Flight(db.Model):
     __tablename__ = 'flights'
+    __table_args__ = (
+        # A flight number repeats every day: (flight_number, flight_date) is the natural key.
+        # Its index also serves lookups by number alone, latest day first.
+        db.Index('uq_flights_flight_number_date', 'flight_number', 'flight_date', unique=True),
+        db.Index('ix_flights_flight_date', 'flight_date'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     flight_number = db.Column(db.String(20), nullable=False)
@@ -46,51 +90,187 @@ class Flight(db.Model):
     # Airline details
     airline_name = db.Column(db.String(50), nullable=True)
 
+    # Change tracking: hash of the data columns and when they last changed
+    fingerprint = db.Column(db.String(40), nullable=True)
+    last_modified = db.Column(db.DateTime, nullable=True, index=True)
+
+    # Everything except flight_number; these are what upstream can change
+    DATA_COLUMNS = (
+        'flight_date', 'flight_status',
+        'departure_airport', 'departure_timezone', 'departure_iata', 'departure_delay',
+        'departure_scheduled', 'departure_actual',
+        'arrival_airport', 'arrival_timezone', 'arrival_iata', 'arrival_scheduled', 'arrival_actual',
+        'airline_name',
+    )
+
     def __repr__(self):
         return f"<Flight {self.flight_number}>"
 
     @staticmethod
-    def convert_to_datetime(datetime_str):
+    def compute_fingerprint(values):
         """
-        Convert a datetime string to a datetime object.
-        Handles multiple formats, including timezone-aware strings.
+        Hash the data columns of a flight.
+        :param values: Mapping of column name to value (e.g. a row about to be saved).
+        :return: 40-character hex digest.
         """
-        if not datetime_str:
-            return None  # Return None if the input is empty or None
+        parts = []
+        for name in Flight.DATA_COLUMNS:
+            value = values.get(name)
+            if value is None:
+                value = ''
+            elif isinstance(value, datetime):
+                value = value.replace(tzinfo=None).isoformat()
+            elif isinstance(value, (int, float)):
+                value = repr(float(value))
+            parts.append(str(value))
+        return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()
 
-        try:
-            # Use dateutil.parser to handle multiple formats, including timezone-aware strings
-            return parser.isoparse(datetime_str)
-        except ValueError:
-            print(f"Failed to parse datetime: {datetime_str}")
-            return None
+    def touch(self):
+        """Recompute the fingerprint after an in-place edit and bump last_modified."""
+        self.fingerprint = Flight.compute_fingerprint({name: getattr(self, name) for name in Flight.DATA_COLUMNS})
+        self.last_modified = datetime.utcnow()
 
     @staticmethod
     def convert_to_datetime(datetime_str):
         """
-        Convert a datetime string to a datetime object.
-        Handles multiple formats, including timezone-aware strings.
+        Convert a datetime string to a UTC-aware datetime object.
+        Handles ISO 8601 formats, including timezone-aware strings; naive ones are taken as UTC.
+        :return: The datetime, or None if the input is empty or cannot be parsed.
         """
-        if not datetime_str:
-            return None  # Return None if the input is empty or None
+        return parse_timestamp(datetime_str)
+
+def normalize_passenger_name(passenger_name):
+    """Search key of a passenger name: Unicode-normalized, whitespace collapsed, casefolded."""
+    return ' '.join(unicodedata.normalize('NFKC', passenger_name).split()).casefold()
+
+
+def normalize_flight_number(flight_number):
+    """Search key of a flight number: without whitespace, upper-case ("tu 712 " -> "TU712")."""
+    return ''.join(flight_number.split()).upper()
+
+
+def _claim_key_default(column, normalize):
+    """Column default computing a search key from the inserted row, for ORM and bulk inserts alike."""
+    return lambda context: normalize(context.get_current_parameters()[column])
 
-        try:
-            # Use dateutil.parser to handle multiple formats, including timezone-aware strings
-            return parser.isoparse(datetime_str)
-        except ValueError:
-            print(f"Failed to parse datetime: {datetime_str}")
-            return None
 
 class Claim(db.Model):
     __tablename__ = 'claims'  # Explicitly set the table name to 'claims'
+    __table_args__ = (
+        db.Index('ix_claims_flight_number', 'flight_number'),
+        db.Index('ix_claims_status_id', 'status', 'id'),  # Pending-claim batches walk (status, id)
+        # Status lookups and duplicate checks by passenger and flight are one probe of this index
+        db.Index('ix_claims_passenger_key_flight_key', 'passenger_key', 'flight_key'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     passenger_name = db.Column(db.String(100), nullable=False)
     flight_number = db.Column(db.String(50), nullable=False)
+    flight_date = db.Column(db.DateTime, nullable=True)  # Day of the flight claimed for, set on submission
+    # Normalized copies of passenger_name and flight_number, filled in on insert
+    passenger_key = db.Column(db.String(100), nullable=False,
+                              default=_claim_key_default('passenger_name', normalize_passenger_name))
+    flight_key = db.Column(db.String(50), nullable=False,
+                           default=_claim_key_default('flight_number', normalize_flight_number))
     claim_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), nullable=False)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
+    # Claims reference flights by natural key; load with selectinload/joinedload to avoid N+1 queries
+    flight = db.relationship(
+        'Flight',
+        primaryjoin='and_(foreign(Claim.flight_number) == Flight.flight_number, '
+                    'foreign(Claim.flight_date).is_not_distinct_from(Flight.flight_date))',
+        uselist=False,
+        viewonly=True
+    )
+
+
+class CompensationRule(db.Model):
+    __tablename__ = 'compensation_rules'
+    id = db.Column(db.Integer, primary_key=True)
+    min_delay = db.Column(db.Integer, nullable=False)  # Minutes, inclusive
+    max_delay = db.Column(db.Integer, nullable=True)  # Minutes, exclusive; NULL means no upper bound
+    amount = db.Column(db.Float, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default='TND')
+    airline_name = db.Column(db.String(50), nullable=True)  # NULL applies to every airline
+    effective_from = db.Column(db.Date, nullable=True)  # NULL means since forever
+    effective_to = db.Column(db.Date, nullable=True)  # Inclusive; NULL means until further notice
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "min_delay": self.min_delay,
+            "max_delay": self.max_delay,
+            "amount": self.amount,
+            "currency": self.currency,
+            "airline_name": self.airline_name,
+            "effective_from": self.effective_from.isoformat() if self.effective_from else None,
+            "effective_to": self.effective_to.isoformat() if self.effective_to else None
+        }
+
+# Seeded into compensation_rules when the table is created (by create_all or by its migration)
+DEFAULT_COMPENSATION_RULES = (
+    {"min_delay": 120, "max_delay": 180, "amount": 100, "currency": "TND"},  # 2–3 hours
+    {"min_delay": 180, "max_delay": 240, "amount": 200, "currency": "TND"},  # 3–4 hours
+    {"min_delay": 240, "max_delay": None, "amount": 300, "currency": "TND"},  # More than 4 hours
+)
+
+
+@event.listens_for(CompensationRule.__table__, 'after_create')
+def seed_compensation_rules(table, connection, **kwargs):
+    connection.execute(table.insert(), [dict(rule) for rule in DEFAULT_COMPENSATION_RULES])
+
+# Dataset names used in sync_state
+FLIGHTS_DATASET = 'flights'
+CLAIMS_DATASET = 'claims'
+COMPENSATION_RULES_DATASET = 'compensation_rules'
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'  # One row per dataset (e.g. 'flights', 'claims')
+    name = db.Column(db.String(50), primary_key=True)
+    last_refreshed_at = db.Column(db.DateTime, nullable=True)
+    version = db.Column(db.Integer, nullable=False, default=0)  # Bumped by every write to the dataset
+    modified_at = db.Column(db.DateTime, nullable=True)  # Time of the last bump
+
+    @staticmethod
+    def get_last_refreshed(name):
+        """Return when the dataset was last refreshed, or None if it never was."""
+        state = SyncState.query.get(name)
+        return state.last_refreshed_at if state else None
+
+    @staticmethod
+    def mark_refreshed(name, when=None):
+        """Record a successful refresh of the dataset (the caller commits)."""
+        state = SyncState.query.get(name)
+        if state is None:
+            state = SyncState(name=name)
+            db.session.add(state)
+        state.last_refreshed_at = when or datetime.utcnow()
+        return state
+
+    @staticmethod
+    def get_version(name):
+        """Return (version, modified_at) of the dataset; (0, None) if it was never written."""
+        state = SyncState.query.get(name)
+        return (state.version, state.modified_at) if state else (0, None)
+
+    @staticmethod
+    def bump_version(name, when=None):
+        """
+        Record a write to the dataset (the caller commits, in the same transaction as the write).
+        The increment is done in SQL so concurrent writers never lose a bump.
+        """
+        when = when or datetime.utcnow()
+        state = SyncState.query.get(name)
+        if state is None:
+            state = SyncState(name=name, version=1)
+            db.session.add(state)
+        else:
+            state.version = SyncState.version + 1
+        state.modified_at = when
+        return state
+
 # Simplified Schema for Response
 class SimplifiedFlightSchema(Schema):
     id = fields.Int(dump_only=True)
@@ -103,32 +283,3 @@ class SimplifiedFlightSchema(Schema):
 
     class Meta:
         fields = ("id", "flight_number", "flight_date", "flight_status", "departure", "arrival", "airline")
-
-
-# Helper function to create simplified flight response
-def create_simplified_flight_response(flight):
-    """Helper function to create a simplified flight response."""
-    return {
-        "id": flight.id,
-        "flight_number": flight.flight_number,
-        "flight_date": flight.flight_date.isoformat() if flight.flight_date else None,
-        "flight_status": flight.flight_status,
-        "departure": {
-            "actual": flight.departure_actual.isoformat() if flight.departure_actual else None,
-            "airport": flight.departure_airport,
-            "iata": flight.departure_iata,
-            "delay": flight.departure_delay,  # Include the delay field
-            "scheduled": flight.departure_scheduled.isoformat() if flight.departure_scheduled else None,
-            "timezone": flight.departure_timezone
-        },
-        "arrival": {
-            "actual": flight.arrival_actual.isoformat() if flight.arrival_actual else None,
-            "airport": flight.arrival_airport,
-            "iata": flight.arrival_iata,
-            "scheduled": flight.arrival_scheduled.isoformat() if flight.arrival_scheduled else None,
-            "timezone": flight.arrival_timezone
-        },
-        "airline": {
-            "name": flight.airline_name
-        }
-    }
\ No newline at end of file
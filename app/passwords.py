@@ -0,0 +1,80 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the pool's queue is full, or a job did not finish in time."""
+
+
+class HashingPool:
+    """
+    A few threads that run password hashing, so a burst of logins uses at most
+    `workers` cores (hashlib releases the GIL) instead of one per request thread.
+    At most `queue_limit` more jobs may wait; past that, submissions are refused.
+    """
+
+    def __init__(self, workers=2, queue_limit=16):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def run(self, fn, *args, timeout=None):
+        """Run fn(*args) on the pool and wait at most `timeout` seconds for its result."""
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolBusy("Password hashing queue is full")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is freed when the job ends, even if the caller stopped waiting
+        future.add_done_callback(lambda _future: self._slots.release())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            raise HashingPoolBusy("Password hashing timed out")
+
+
+def get_hashing_pool(app):
+    """The app's HashingPool, sized by LOGIN_HASH_WORKERS / LOGIN_HASH_QUEUE."""
+    pool = app.extensions.get('hashing_pool')
+    if pool is None:
+        pool = app.extensions.setdefault('hashing_pool', HashingPool(
+            app.config['LOGIN_HASH_WORKERS'], app.config['LOGIN_HASH_QUEUE']
+        ))
+    return pool
+
+
+@lru_cache(maxsize=8)
+def _reference_hash(method):
+    """A hash made with `method`, for its normalized prefix and as a decoy for unknown users."""
+    return generate_password_hash('', method)
+
+
+def hash_prefix(password_hash):
+    """The method part of a werkzeug hash, e.g. "scrypt:32768:8:1"."""
+    return password_hash.split('$', 1)[0]
+
+
+def needs_rehash(password_hash, method):
+    """Whether a stored hash was made with another method or cost than `method`."""
+    return hash_prefix(password_hash) != hash_prefix(_reference_hash(method))
+
+
+def check_password(password_hash, password, method):
+    """
+    Check a password and, if it matches a hash made with an outdated method or cost,
+    hash it again with `method`. Meant to run on the HashingPool.
+    :param password_hash: The stored hash, or None for an unknown user (checked against
+                          a decoy so the response takes as long as for a known one).
+    :return: Tuple (matches, new hash or None).
+    """
+    if password_hash is None:
+        check_password_hash(_reference_hash(method), password)
+        return False, None
+    if not check_password_hash(password_hash, password):
+        return False, None
+    if needs_rehash(password_hash, method):
+        return True, generate_password_hash(password, method)
+    return True, None
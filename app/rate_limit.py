@@ -0,0 +1,86 @@
+import hashlib
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import case, delete, update
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import RateLimitCounter
+
+
+class RateLimited(Exception):
+    """Raised when a limit is reached; retry_after is the number of seconds until the window ends."""
+
+    def __init__(self, scope, retry_after):
+        super().__init__(f"Too many attempts ({scope})")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def _window(window):
+    """Index of the current fixed window and the seconds left in it."""
+    now = time.time()
+    return int(now // window), int(window - now % window) + 1
+
+
+def rate_limit_key(scope, value):
+    """The counter's primary key; hashed, so any value (e.g. a submitted username) fits."""
+    return hashlib.sha256(f"{scope}:{value}".encode('utf-8')).hexdigest()
+
+
+def hit(scope, value, window):
+    """
+    Record one hit for (scope, value) in the current window and return the new count.
+    The counters live in the database, shared by every worker and never evicted;
+    the increment is one conditional UPDATE, so concurrent hits each get their own count.
+    """
+    index, left = _window(window)
+    key = rate_limit_key(scope, value)
+    expires_at = datetime.utcnow() + timedelta(seconds=left)
+    increment = (
+        update(RateLimitCounter)
+        .where(RateLimitCounter.key == key)
+        .values(count=case((RateLimitCounter.window == index, RateLimitCounter.count + 1), else_=1),
+                window=index, expires_at=expires_at)
+        .returning(RateLimitCounter.count)
+    )
+    count = db.session.execute(increment).scalar()
+    if count is None:
+        # First hit of this key: drop the counters of ended windows while at it
+        db.session.execute(delete(RateLimitCounter).where(RateLimitCounter.expires_at <= datetime.utcnow()))
+        db.session.add(RateLimitCounter(key=key, window=index, count=1, expires_at=expires_at))
+        try:
+            db.session.commit()
+            return 1
+        except IntegrityError:
+            db.session.rollback()  # A concurrent first hit created it
+            count = db.session.execute(increment).scalar()
+    db.session.commit()
+    return count
+
+
+def reserve(scope, value, limit, window):
+    """
+    Count one attempt for (scope, value) before doing the work it is limited on.
+    Raises RateLimited if that makes more than `limit` in the current window (0 for no limit).
+    """
+    if limit <= 0:
+        return
+    if hit(scope, value, window) > limit:
+        raise RateLimited(scope, _window(window)[1])
+
+
+def refund(scope, value, window):
+    """Give back an attempt taken by reserve() that turned out not to count."""
+    index, _left = _window(window)
+    db.session.execute(
+        update(RateLimitCounter)
+        .where(RateLimitCounter.key == rate_limit_key(scope, value), RateLimitCounter.window == index,
+               RateLimitCounter.count > 0)
+        .values(count=RateLimitCounter.count - 1)
+    )
+    db.session.commit()
+
+
+def reset(scope, value):
+    db.session.execute(delete(RateLimitCounter).where(RateLimitCounter.key == rate_limit_key(scope, value)))
+    db.session.commit()
@@ -0,0 +1,62 @@
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update
+from app.extensions import db
+from app.models import RefreshToken
+
+
+def issue_refresh_token(admin_id, ttl):
+    """
+    Create a refresh token valid for `ttl` seconds (the caller commits) and drop the
+    admin's expired ones.
+    :return: The token; it is not stored and cannot be recovered.
+    """
+    now = datetime.utcnow()
+    db.session.execute(delete(RefreshToken).where(RefreshToken.admin_id == admin_id,
+                                                  RefreshToken.expires_at <= now))
+    token = secrets.token_urlsafe(32)
+    db.session.add(RefreshToken(admin_id=admin_id, token_hash=RefreshToken.hash_token(token),
+                                created_at=now, expires_at=now + timedelta(seconds=ttl)))
+    return token
+
+
+def revoke_admin_tokens(admin_id):
+    """Revoke every live refresh token of an admin (the caller commits)."""
+    db.session.execute(update(RefreshToken)
+                       .where(RefreshToken.admin_id == admin_id, RefreshToken.revoked_at.is_(None))
+                       .values(revoked_at=datetime.utcnow()))
+
+
+def rotate_refresh_token(token, ttl):
+    """
+    Use a refresh token: revoke it and issue its replacement, in one transaction.
+    Presenting a token that was already used means it leaked (or the client raced
+    itself), so every token of that admin is revoked.
+    :return: Tuple (admin_id, new token), or None if the token is unknown, expired or used.
+    """
+    now = datetime.utcnow()
+    stored = RefreshToken.query.filter_by(token_hash=RefreshToken.hash_token(token)).first()
+    if stored is None or stored.expires_at <= now:
+        return None
+
+    # Conditional update: of two concurrent uses of the same token only one wins
+    used = db.session.execute(update(RefreshToken)
+                              .where(RefreshToken.id == stored.id, RefreshToken.revoked_at.is_(None))
+                              .values(revoked_at=now)).rowcount
+    if not used:
+        revoke_admin_tokens(stored.admin_id)
+        db.session.commit()
+        return None
+
+    new_token = issue_refresh_token(stored.admin_id, ttl)
+    db.session.commit()
+    return stored.admin_id, new_token
+
+
+def revoke_refresh_token(token):
+    """Revoke one refresh token (e.g. on logout); unknown tokens are ignored."""
+    db.session.execute(update(RefreshToken)
+                       .where(RefreshToken.token_hash == RefreshToken.hash_token(token),
+                              RefreshToken.revoked_at.is_(None))
+                       .values(revoked_at=datetime.utcnow()))
+    db.session.commit()
@@ -1,5 +1,5 @@
 # app/schemas.py
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate, validates_schema, ValidationError
 
 class ClaimSchema(Schema):
     passenger_name = fields.Str(required=True)
@@ -9,3 +9,21 @@ class ClaimSchema(Schema):
     created_at = fields.DateTime()
     updated_at = fields.DateTime()
 
+
+class CompensationRuleSchema(Schema):
+    min_delay = fields.Int(required=True, validate=validate.Range(min=0))
+    max_delay = fields.Int(allow_none=True, validate=validate.Range(min=0))
+    amount = fields.Float(required=True, validate=validate.Range(min=0))
+    currency = fields.Str(validate=validate.Length(equal=3))
+    airline_name = fields.Str(allow_none=True)
+    effective_from = fields.Date(allow_none=True)
+    effective_to = fields.Date(allow_none=True)
+
+    @validates_schema
+    def validate_ranges(self, data, **kwargs):
+        if data.get('max_delay') is not None and data.get('min_delay') is not None \
+                and data['max_delay'] <= data['min_delay']:
+            raise ValidationError("max_delay must be greater than min_delay", "max_delay")
+        if data.get('effective_from') and data.get('effective_to') \
+                and data['effective_to'] < data['effective_from']:
+            raise ValidationError("effective_to must not be before effective_from", "effective_to")
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime
+from operator import attrgetter
+from flask.json.provider import DefaultJSONProvider
+from app.models import Flight, Claim
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used when orjson is not installed
+    orjson = None
+
+# Columns selected for a flight response, in the order serialize_flight unpacks them.
+# Selecting plain columns returns tuples and skips building ORM instances.
+FLIGHT_FIELDS = (
+    'id', 'flight_number', 'flight_date', 'flight_status',
+    'departure_actual', 'departure_airport', 'departure_iata', 'departure_delay',
+    'departure_scheduled', 'departure_timezone',
+    'arrival_actual', 'arrival_airport', 'arrival_iata', 'arrival_scheduled', 'arrival_timezone',
+    'airline_name',
+)
+FLIGHT_COLUMNS = tuple(getattr(Flight, name) for name in FLIGHT_FIELDS)
+flight_values = attrgetter(*FLIGHT_FIELDS)  # Same tuple from a Flight instance
+
+CLAIM_FIELDS = ('id', 'passenger_name', 'flight_number', 'claim_amount', 'status', 'created_at', 'updated_at')
+CLAIM_COLUMNS = tuple(getattr(Claim, name) for name in CLAIM_FIELDS)
+
+_isoformat = datetime.isoformat  # Looked up once; every timestamp column is a DateTime
+
+
+def serialize_flight(row):
+    """
+    Build the simplified flight response from a row of FLIGHT_COLUMNS.
+    Use flight_values(flight) to serialize a Flight instance.
+    """
+    (flight_id, flight_number, flight_date, flight_status,
+     departure_actual, departure_airport, departure_iata, departure_delay,
+     departure_scheduled, departure_timezone,
+     arrival_actual, arrival_airport, arrival_iata, arrival_scheduled, arrival_timezone,
+     airline_name) = row
+    return {
+        "id": flight_id,
+        "flight_number": flight_number,
+        "flight_date": _isoformat(flight_date) if flight_date else None,
+        "flight_status": flight_status,
+        "departure": {
+            "actual": _isoformat(departure_actual) if departure_actual else None,
+            "airport": departure_airport,
+            "iata": departure_iata,
+            "delay": departure_delay,
+            "scheduled": _isoformat(departure_scheduled) if departure_scheduled else None,
+            "timezone": departure_timezone
+        },
+        "arrival": {
+            "actual": _isoformat(arrival_actual) if arrival_actual else None,
+            "airport": arrival_airport,
+            "iata": arrival_iata,
+            "scheduled": _isoformat(arrival_scheduled) if arrival_scheduled else None,
+            "timezone": arrival_timezone
+        },
+        "airline": {
+            "name": airline_name
+        }
+    }
+
+
+def serialize_flights(rows):
+    return [serialize_flight(row) for row in rows]
+
+
+def serialize_claim(row):
+    """Build the public claim response (ISO 8601 timestamps) from a row of CLAIM_COLUMNS."""
+    claim_id, passenger_name, flight_number, claim_amount, status, created_at, updated_at = row
+    return {
+        "claim_id": claim_id,
+        "passenger_name": passenger_name,
+        "flight_number": flight_number,
+        "claim_amount": claim_amount,
+        "status": status,
+        "created_at": _isoformat(created_at) if created_at else None,
+        "updated_at": _isoformat(updated_at) if updated_at else None
+    }
+
+
+def serialize_admin_claim(row):
+    """
+    Build the admin claim response from a row of CLAIM_COLUMNS followed by the
+    flight number of the joined flight (None if the flight is unknown).
+    Timestamps are left as datetimes; the JSON provider renders them as HTTP dates.
+    """
+    claim_id, passenger_name, _claim_flight, claim_amount, status, created_at, updated_at, flight_number = row
+    return {
+        "claim_id": claim_id,
+        "passenger_name": passenger_name,
+        "flight_number": flight_number or "Unknown",
+        "claim_amount": claim_amount,
+        "status": status,
+        "created_at": created_at,
+        "updated_at": updated_at
+    }
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    ORJSON_ERRORS = (orjson.JSONEncodeError,)
+else:
+    ORJSON_OPTIONS = 0
+    ORJSON_ERRORS = ()
+
+
+def dumps(obj):
+    """Encode obj as JSON, with orjson when it is installed."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=ORJSON_OPTIONS).decode('utf-8')
+        except ORJSON_ERRORS:
+            pass
+    return json.dumps(obj, sort_keys=True)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that encodes with orjson when it is installed.
+    Output matches the default provider: sorted keys, and datetimes, dates,
+    decimals and UUIDs go through the same default() hook.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if kwargs.get('indent') else 0)
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except ORJSON_ERRORS:
+            # e.g. integers wider than 64 bits; the stdlib encoder handles those
+            return super().dumps(obj, **kwargs)
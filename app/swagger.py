@@ -1,3 +1,4 @@
+import hashlib
 from apispec import APISpec
 from apispec.ext.marshmallow import MarshmallowPlugin
 from apispec_webframeworks.flask import FlaskPlugin
@@ -52,6 +53,21 @@ def create_swagger_spec(app):
         }
     })
 
+    spec.components.schema("StoredCompensationRule", {
+        "type": "object",
+        "properties": {
+            "id": {"type": "integer", "readOnly": True},
+            "min_delay": {"type": "integer"},
+            "max_delay": {"type": "integer", "nullable": True},
+            "amount": {"type": "number"},
+            "currency": {"type": "string", "example": "TND"},
+            "airline_name": {"type": "string", "nullable": True},
+            "effective_from": {"type": "string", "format": "date", "nullable": True},
+            "effective_to": {"type": "string", "format": "date", "nullable": True}
+        },
+        "required": ["min_delay", "amount"]
+    })
+
     spec.components.schema("ClaimDetails", {
         "type": "object",
         "properties": {
@@ -149,6 +165,17 @@ def create_swagger_spec(app):
         }
     })
 
+    spec.components.schema("FlightPage", {
+        "type": "object",
+        "properties": {
+            "flights": {
+                "type": "array",
+                "items": {"$ref": "#/components/schemas/Flight"}
+            },
+            "next_cursor": {"type": "string", "nullable": True}
+        }
+    })
+
     spec.components.schema("FlightResponse", {
         "type": "object",
         "properties": {
@@ -169,10 +196,20 @@ def create_swagger_spec(app):
     spec.components.schema("LoginResponse", {
         "type": "object",
         "properties": {
-            "token": {"type": "string"}
+            "token": {"type": "string"},
+            "refresh_token": {"type": "string"},
+            "expires_in": {"type": "integer", "description": "Lifetime of the access token in seconds"}
         }
     })
 
+    spec.components.schema("RefreshRequest", {
+        "type": "object",
+        "properties": {
+            "refresh_token": {"type": "string"}
+        },
+        "required": ["refresh_token"]
+    })
+
     # Add paths (endpoints)
     with app.test_request_context():
         # Add /api/claims endpoint
@@ -200,7 +237,58 @@ def create_swagger_spec(app):
                             }
                         },
                         "400": {"description": "Invalid input data."},
-                        "404": {"description": "Flight not found."}
+                        "404": {"description": "Flight not found."},
+                        "409": {"description": "A claim for this passenger and flight already exists; its claim_id and status are returned."}
+                    }
+                }
+            }
+        )
+
+        # Add /api/claims/bulk endpoint
+        spec.path(
+            view=app.view_functions['claim_api.submit_claims_bulk'],
+            operations={
+                "post": {
+                    "summary": "Submit many claims at once",
+                    "description": "Submit up to CLAIMS_BULK_MAX claims (a JSON array, or {\"claims\": [...]}). Valid claims are saved in one transaction; each item gets a result: created, invalid, flight_not_found or duplicate.",
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/json": {
+                                "schema": {"type": "array", "items": {"$ref": "#/components/schemas/ClaimRequest"}}
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Per-item results, in request order.",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "created": {"type": "integer"},
+                                            "rejected": {"type": "integer"},
+                                            "results": {
+                                                "type": "array",
+                                                "items": {
+                                                    "type": "object",
+                                                    "properties": {
+                                                        "index": {"type": "integer"},
+                                                        "result": {"type": "string", "enum": ["created", "invalid", "flight_not_found", "duplicate"]},
+                                                        "claim_id": {"type": "integer"},
+                                                        "status": {"type": "string"},
+                                                        "errors": {"type": "object"}
+                                                    }
+                                                }
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "400": {"description": "Not a non-empty array, or more than CLAIMS_BULK_MAX claims."},
+                        "500": {"description": "The claims could not be saved; none were."}
                     }
                 }
             }
@@ -267,25 +355,79 @@ def create_swagger_spec(app):
     }
 )
 
+        # Add /admin/compensation-rules endpoints
+        rule_body = {
+            "required": True,
+            "content": {"application/json": {"schema": {"$ref": "#/components/schemas/StoredCompensationRule"}}}
+        }
+        rule_response = {"application/json": {"schema": {"$ref": "#/components/schemas/StoredCompensationRule"}}}
+        rule_id_param = [{"name": "rule_id", "in": "path", "required": True, "schema": {"type": "integer"}}]
+        spec.path(
+            view=app.view_functions['claim_api.list_compensation_rules'],
+            operations={
+                "get": {
+                    "summary": "List stored compensation rules (Admin Only)",
+                    "responses": {"200": {"description": "All stored rules.", "content": {"application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/StoredCompensationRule"}}}}}},
+                    "security": [{"JWT": []}]
+                },
+                "post": {
+                    "summary": "Add a compensation rule (Admin Only)",
+                    "requestBody": rule_body,
+                    "responses": {"201": {"description": "Rule added.", "content": rule_response}, "400": {"description": "Invalid rule."}, "409": {"description": "The delay range overlaps a rule of the same airline and period."}},
+                    "security": [{"JWT": []}]
+                }
+            }
+        )
+        spec.path(
+            view=app.view_functions['claim_api.update_compensation_rule'],
+            operations={
+                "put": {
+                    "summary": "Update a compensation rule (Admin Only)",
+                    "parameters": rule_id_param,
+                    "requestBody": rule_body,
+                    "responses": {"200": {"description": "Rule updated.", "content": rule_response}, "400": {"description": "Invalid rule."}, "404": {"description": "Rule not found."}, "409": {"description": "The delay range overlaps a rule of the same airline and period."}},
+                    "security": [{"JWT": []}]
+                },
+                "delete": {
+                    "summary": "Delete a compensation rule (Admin Only)",
+                    "parameters": rule_id_param,
+                    "responses": {"200": {"description": "Rule deleted."}, "404": {"description": "Rule not found."}},
+                    "security": [{"JWT": []}]
+                }
+            }
+        )
+
         # Add /admin/claims endpoint
         spec.path(
             view=app.view_functions['claim_api.get_all_claims'],
             operations={
                 "get": {
                     "summary": "Get all claims (Admin Only)",
-                    "description": "Get a list of all claims. Requires admin access.",
+                    "description": "Get a page of claims ordered by id. Pass the returned next_cursor as cursor to get the following page. Requires admin access.",
+                    "parameters": [
+                        {"name": "limit", "in": "query", "required": False, "description": "Page size (1-1000, default 100).", "schema": {"type": "integer"}},
+                        {"name": "cursor", "in": "query", "required": False, "description": "next_cursor from the previous page.", "schema": {"type": "string"}},
+                        {"name": "status", "in": "query", "required": False, "schema": {"type": "string"}}
+                    ],
                     "responses": {
                         "200": {
-                            "description": "List of claims returned successfully.",
+                            "description": "Page of claims returned successfully.",
                             "content": {
                                 "application/json": {
                                     "schema": {
-                                        "type": "array",
-                                        "items": {"$ref": "#/components/schemas/ClaimDetails"}
+                                        "type": "object",
+                                        "properties": {
+                                            "claims": {
+                                                "type": "array",
+                                                "items": {"$ref": "#/components/schemas/ClaimDetails"}
+                                            },
+                                            "next_cursor": {"type": "string", "nullable": True}
+                                        }
                                     }
                                 }
                             }
-                        }
+                        },
+                        "400": {"description": "Invalid limit or cursor."}
                     },
                     "security": [{"JWT": []}]
                 }
@@ -340,6 +482,7 @@ def create_swagger_spec(app):
                         }
                     }
                 },
+                "304": {"description": "Not modified since the ETag / Last-Modified the client holds."},
                 "400": {
                     "description": "Invalid input. Either claim_id or passenger_name and flight_number are required.",
                     "content": {
@@ -402,6 +545,61 @@ def create_swagger_spec(app):
             }
         )
 
+        # Add /admin/claims/compensation/batch endpoint
+        spec.path(
+            view=app.view_functions['claim_api.process_pending_claims_batch'],
+            operations={
+                "post": {
+                    "summary": "Process pending claims in bulk",
+                    "description": "Calculate compensation for every pending claim, one chunk per transaction, then re-score the approved and denied claims of flights changed since the last run. Requires admin access.",
+                    "requestBody": {
+                        "required": False,
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "chunk_size": {"type": "integer", "example": 500},
+                                        "max_claims": {"type": "integer"}
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "Processing statistics.",
+                            "content": {
+                                "application/json": {
+                                    "schema": {
+                                        "type": "object",
+                                        "properties": {
+                                            "processed": {"type": "integer"},
+                                            "approved": {"type": "integer"},
+                                            "denied": {"type": "integer"},
+                                            "skipped": {"type": "integer"},
+                                            "chunks": {"type": "integer"},
+                                            "elapsed_seconds": {"type": "number"},
+                                            "claims_per_second": {"type": "number"},
+                                            "rescore": {
+                                                "type": "object",
+                                                "properties": {
+                                                    "changed_flights": {"type": "integer"},
+                                                    "rescored": {"type": "integer"}
+                                                }
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        },
+                        "400": {"description": "Invalid chunk_size or max_claims."}
+                    },
+                    "security": [{"JWT": []}]
+                }
+            }
+        )
+
         # Add /api/claims/{claim_id} endpoint
         spec.path(
             view=app.view_functions['claim_api.get_claim_details'],
@@ -438,22 +636,34 @@ def create_swagger_spec(app):
             view=app.view_functions['flight_api.get_flights'],
             operations={
                 "get": {
-                    "summary": "Get all flights",
-                    "description": "Fetch all flights departing from Tunis-Carthage Airport (TUN).",
+                    "summary": "List flights",
+                    "description": "List flights departing from Tunis-Carthage Airport (TUN), one page at a time ordered by id. Served from the local database, which a background ingestion job refreshes from AviationStack. Pass the returned next_cursor as cursor to get the following page.",
+                    "parameters": [
+                        {"name": "limit", "in": "query", "required": False, "description": "Page size (1-1000, default 100).", "schema": {"type": "integer"}},
+                        {"name": "cursor", "in": "query", "required": False, "description": "next_cursor from the previous page.", "schema": {"type": "string"}},
+                        {"name": "date_from", "in": "query", "required": False, "description": "Earliest flight_date (ISO 8601).", "schema": {"type": "string", "format": "date"}},
+                        {"name": "date_to", "in": "query", "required": False, "description": "Latest flight_date (ISO 8601).", "schema": {"type": "string", "format": "date"}},
+                        {"name": "flight_status", "in": "query", "required": False, "schema": {"type": "string"}},
+                        {"name": "arrival_iata", "in": "query", "required": False, "schema": {"type": "string"}},
+                        {"name": "airline_name", "in": "query", "required": False, "schema": {"type": "string"}},
+                        {"name": "min_delay", "in": "query", "required": False, "description": "Minimum departure delay in minutes.", "schema": {"type": "number"}}
+                    ],
                     "responses": {
                         "200": {
                             "description": "List of flights returned successfully.",
+                            "headers": {
+                                "X-Data-Refreshed-At": {"description": "When the flight data was last refreshed from upstream (UTC).", "schema": {"type": "string", "format": "date-time"}},
+                                "X-Data-Age": {"description": "Seconds since the last refresh.", "schema": {"type": "integer"}}
+                            },
                             "content": {
                                 "application/json": {
-                                    "schema": {
-                                        "type": "array",
-                                        "items": {"$ref": "#/components/schemas/Flight"}
-                                    }
+                                    "schema": {"$ref": "#/components/schemas/FlightPage"}
                                 }
                             }
                         },
-                        "404": {"description": "No flight data available."},
-                        "500": {"description": "Failed to fetch flight data."}
+                        "304": {"description": "Not modified since the ETag / Last-Modified the client holds."},
+                        "400": {"description": "Invalid filter, limit or cursor."},
+                        "404": {"description": "No flight data available."}
                     }
                 }
             }
@@ -504,7 +714,7 @@ def create_swagger_spec(app):
         operations={
         "get": {
             "summary": "Get flight details",
-            "description": "Fetch the details of a specific flight by its flight number.",
+            "description": "Fetch the details of a specific flight by its flight number. A flight number repeats every day; its latest day is returned.",
             "parameters": [
                 {
                     "name": "flight_number",
@@ -523,6 +733,7 @@ def create_swagger_spec(app):
                         }
                     }
                 },
+                "304": {"description": "Not modified since the ETag / Last-Modified the client holds."},
                 "404": {
                     "description": "Flight not found."
                 }
@@ -547,6 +758,13 @@ def create_swagger_spec(app):
                     "in": "path",
                     "required": True,
                     "schema": {"type": "string"}
+                },
+                {
+                    "name": "flight_date",
+                    "in": "query",
+                    "required": False,
+                    "schema": {"type": "string", "format": "date"},
+                    "description": "Day of the flight to update; the latest day of the flight number if omitted."
                 }
             ],
             "requestBody": {
@@ -566,6 +784,9 @@ def create_swagger_spec(app):
                         }
                     }
                 },
+                "400": {
+                    "description": "Invalid flight_date, or another flight already has this number on this date."
+                },
                 "401": {
                     "description": "Unauthorized. Invalid or missing token."
                 },
@@ -585,7 +806,7 @@ def create_swagger_spec(app):
     operations={
         "get": {
             "summary": "Get flight details",
-            "description": "Fetch the details of a specific flight by its flight number.",
+            "description": "Fetch the details of a specific flight by its flight number. A flight number repeats every day; its latest day is returned.",
             "parameters": [
                 {
                     "name": "flight_number",
@@ -612,6 +833,37 @@ def create_swagger_spec(app):
     }
 )
 
+        # Add /admin/export/flights and /admin/export/claims endpoints
+        for view_name, summary in (
+            ('export_api.export_flights', "Stream all flights (Admin Only)"),
+            ('export_api.export_claims', "Stream all claims (Admin Only)"),
+        ):
+            spec.path(
+                view=app.view_functions[view_name],
+                operations={
+                    "get": {
+                        "summary": summary,
+                        "description": "Stream rows as NDJSON (default) or, with format=json, as a chunked JSON array. Requires admin access.",
+                        "parameters": [
+                            {"name": "format", "in": "query", "required": False, "schema": {"type": "string", "enum": ["ndjson", "json"]}}
+                        ],
+                        "responses": {
+                            "200": {
+                                "description": "Export stream.",
+                                "content": {
+                                    "application/x-ndjson": {"schema": {"type": "string"}},
+                                    "application/json": {"schema": {"type": "array", "items": {"type": "object"}}}
+                                }
+                            },
+                            "400": {"description": "Invalid format or filter."},
+                            "401": {"description": "Unauthorized. Invalid or missing token."},
+                            "403": {"description": "Forbidden. Admin access required."}
+                        },
+                        "security": [{"JWT": []}]
+                    }
+                }
+            )
+
         # Add /api/login endpoint
         spec.path(
             view=app.view_functions['login_api.login'],
@@ -642,4 +894,64 @@ def create_swagger_spec(app):
             }
         )
 
-    return spec
\ No newline at end of file
+        # Add /admin/token/refresh endpoint
+        spec.path(
+            view=app.view_functions['login_api.refresh_token'],
+            operations={
+                "post": {
+                    "summary": "Trade a refresh token for new tokens",
+                    "description": "Issue a new access token and a new refresh token without a password check. Each refresh token works once.",
+                    "requestBody": {
+                        "required": True,
+                        "content": {
+                            "application/json": {
+                                "schema": {"$ref": "#/components/schemas/RefreshRequest"}
+                            }
+                        }
+                    },
+                    "responses": {
+                        "200": {
+                            "description": "New tokens.",
+                            "content": {
+                                "application/json": {
+                                    "schema": {"$ref": "#/components/schemas/LoginResponse"}
+                                }
+                            }
+                        },
+                        "400": {"description": "refresh_token is missing."},
+                        "401": {"description": "Invalid, expired or already used refresh token."}
+                    }
+                }
+            }
+        )
+
+        # Add /admin/logout endpoint
+        spec.path(
+            view=app.view_functions['login_api.logout'],
+            operations={
+                "post": {
+                    "summary": "Revoke the current token",
+                    "description": "Revoke the JWT token of the request, and the refresh token given in the body if any.",
+                    "responses": {
+                        "200": {"description": "Token revoked."},
+                        "401": {"description": "Unauthorized. Invalid or missing token."},
+                        "403": {"description": "Forbidden. Admin access required."}
+                    },
+                    "security": [{"JWT": []}]
+                }
+            }
+        )
+
+    return spec
+
+
+def swagger_spec_version(app):
+    """
+    Digest of what the specification is generated from: this module and the app's routes.
+    Cached specs carry it, so one written by an earlier deploy is rebuilt rather than served.
+    """
+    with open(__file__, 'rb') as source:
+        digest = hashlib.md5(source.read())
+    for rule in sorted(app.url_map.iter_rules(), key=lambda rule: rule.rule):
+        digest.update(f"{rule.rule} {sorted(rule.methods)}".encode('utf-8'))
+    return digest.hexdigest()
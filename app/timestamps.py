@@ -0,0 +1,126 @@
+import threading
+from datetime import datetime, timezone
+from dateutil import parser as dateutil_parser
+
+
+def to_utc(value):
+    """A datetime as a UTC-aware value; naive values are taken to be UTC already."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _parse(text):
+    """
+    Parse one timestamp string.
+    :return: (UTC-aware datetime, whether dateutil was needed); raises ValueError.
+    """
+    try:
+        return to_utc(datetime.fromisoformat(text)), False
+    except ValueError:
+        # Before Python 3.11 fromisoformat rejects "Z" and the basic format; dateutil does not
+        return to_utc(dateutil_parser.isoparse(text)), True
+
+
+class TimestampMetrics:
+    """Parse counters of the process; failures are counted here instead of printed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.parsed = 0
+        self.memo_hits = 0
+        self.fallbacks = 0  # Strings fromisoformat rejected and dateutil parsed
+        self.failures = 0
+        self.last_failure = None
+
+    def add(self, parsed=0, memo_hits=0, fallbacks=0, failures=0, last_failure=None):
+        with self._lock:
+            self.parsed += parsed
+            self.memo_hits += memo_hits
+            self.fallbacks += fallbacks
+            self.failures += failures
+            if last_failure is not None:
+                self.last_failure = last_failure
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "parsed": self.parsed,
+                "memo_hits": self.memo_hits,
+                "fallbacks": self.fallbacks,
+                "failures": self.failures,
+                "last_failure": self.last_failure,
+            }
+
+
+timestamp_metrics = TimestampMetrics()
+
+
+class TimestampParser:
+    """
+    Timestamp normalization for one batch of records: every value becomes a UTC-aware
+    datetime (or None), and each distinct string is parsed once however often it repeats.
+    Counters are kept locally and added to timestamp_metrics by flush().
+    """
+
+    def __init__(self, metrics=timestamp_metrics):
+        self.metrics = metrics
+        self._memo = {}
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.parsed = 0
+        self.memo_hits = 0
+        self.fallbacks = 0
+        self.failures = 0
+        self.last_failure = None
+
+    def parse(self, value):
+        """
+        :param value: ISO 8601 string, datetime or None.
+        :return: UTC-aware datetime, or None for an empty or unparseable value.
+        """
+        if not value:
+            return None
+        if isinstance(value, datetime):
+            return to_utc(value)
+        try:
+            result = self._memo[value]
+        except KeyError:
+            try:
+                result, fallback = _parse(value)
+                self.parsed += 1
+                self.fallbacks += fallback
+            except (ValueError, TypeError, OverflowError):
+                result = None
+            self._memo[value] = result
+        else:
+            self.memo_hits += 1
+        if result is None:
+            self.failures += 1
+            self.last_failure = str(value)[:100]
+        return result
+
+    def parse_naive(self, value):
+        """Like parse(), as a naive UTC datetime for the DateTime columns."""
+        result = self.parse(value)
+        return result.replace(tzinfo=None) if result else None
+
+    def flush(self):
+        """Add this batch's counters to the process metrics and drop the memo."""
+        self.metrics.add(self.parsed, self.memo_hits, self.fallbacks, self.failures, self.last_failure)
+        self._reset_counters()
+        self._memo.clear()
+
+
+def parse_timestamp(value):
+    """Parse a single value (see TimestampParser.parse), counting it in timestamp_metrics."""
+    timestamps = TimestampParser()
+    try:
+        return timestamps.parse(value)
+    finally:
+        timestamps.flush()
+
+
+def timestamp_stats():
+    return timestamp_metrics.as_dict()
@@ -0,0 +1,120 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+import jwt
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import RevokedToken
+
+
+def token_digest(token):
+    """SHA-256 of a token: what the caches and revoked_tokens are keyed by, so raw tokens are never stored."""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Claims of recently verified tokens, keyed by token digest. An entry lives at most
+    `ttl` seconds and never past the token's exp; beyond `max_entries` the least
+    recently used entry is dropped.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # digest -> (expires_at, claims)
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        """Cached claims of a token, or None."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[digest]
+            self.misses += 1
+            return None
+
+    def put(self, digest, claims):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if isinstance(claims.get('exp'), (int, float)):
+            expires_at = min(expires_at, claims['exp'])
+        with self._lock:
+            self._entries[digest] = (expires_at, claims)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._entries.pop(digest, None)
+
+    def as_dict(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def get_token_cache(app):
+    """The app's VerifiedTokenCache, sized by JWT_VERIFIED_CACHE_SIZE / JWT_VERIFIED_CACHE_TTL."""
+    token_cache = app.extensions.get('token_cache')
+    if token_cache is None:
+        token_cache = app.extensions.setdefault('token_cache', VerifiedTokenCache(
+            app.config['JWT_VERIFIED_CACHE_SIZE'], app.config['JWT_VERIFIED_CACHE_TTL']
+        ))
+    return token_cache
+
+
+def is_revoked(digest):
+    return db.session.get(RevokedToken, digest) is not None
+
+
+def verify_token(app, token):
+    """
+    Return the claims of a valid, unrevoked token, verifying its signature only when
+    they are not cached yet. Raises jwt.InvalidTokenError (ExpiredSignatureError for
+    an expired one).
+    """
+    digest = token_digest(token)
+    token_cache = get_token_cache(app)
+    claims = token_cache.get(digest)
+    if claims is None:
+        claims = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        # The denylist is in the database, so nothing can evict it; it is read on cache
+        # misses only, which bounds how long another worker accepts a revoked token
+        # to JWT_VERIFIED_CACHE_TTL
+        if is_revoked(digest):
+            raise jwt.InvalidTokenError("Token has been revoked")
+        token_cache.put(digest, claims)
+    return dict(claims)
+
+
+def revoke_token(app, token, claims):
+    """Deny a token until it expires (e.g. on logout)."""
+    digest = token_digest(token)
+    expires_at = None  # A token without exp stays denied for good
+    if isinstance(claims.get('exp'), (int, float)):
+        expires_at = datetime.utcfromtimestamp(claims['exp'])
+
+    # Dead tokens are refused anyway, their entries can go
+    db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+    if not is_revoked(digest):
+        db.session.add(RevokedToken(token_hash=digest, expires_at=expires_at))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # A concurrent logout revoked it first
+    get_token_cache(app).discard(digest)
+
+
+def token_cache_stats(app):
+    return get_token_cache(app).as_dict()
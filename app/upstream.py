@@ -0,0 +1,203 @@
+import asyncio
+import random
+import threading
+import time
+from collections import Counter, deque
+import httpx
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling the upstream while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after `failure_threshold` consecutive failed calls.
+    After `reset_timeout` seconds calls are let through again (half-open); the first
+    success closes the circuit, a failure opens it for another `reset_timeout`.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            return self.state != self.OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"Upstream circuit opened after {self.failures} consecutive failures.")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def as_dict(self):
+        return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class UpstreamMetrics:
+    """Per-request latency and outcome counters, latencies over the last `window` requests."""
+
+    def __init__(self, window=1000):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.rejected = 0  # Calls refused by the open circuit
+        self.statuses = Counter()
+        self.latencies = deque(maxlen=window)
+
+    def record(self, latency, status=None):
+        """Record one HTTP request; status is None when no response came back."""
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if status is None:
+                self.errors += 1
+            else:
+                self.statuses[status] += 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def as_dict(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "errors": self.errors,
+                "rejected": self.rejected,
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1),
+            }
+        return stats
+
+
+class UpstreamClient:
+    """
+    HTTP client for AviationStack: keep-alive connection pool, separate connect and
+    read timeouts, jittered exponential retry on 429/5xx and network errors, and a
+    circuit breaker shared by every call of the process.
+    """
+
+    def __init__(self, base_url, connect_timeout=5.0, read_timeout=30.0, max_retries=3,
+                 backoff_base=0.5, backoff_max=10.0, breaker=None, metrics=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.metrics = metrics or UpstreamMetrics()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            base_url=config['AVIATIONSTACK_BASE_URL'],
+            connect_timeout=config['UPSTREAM_CONNECT_TIMEOUT'],
+            read_timeout=config['UPSTREAM_READ_TIMEOUT'],
+            max_retries=config['UPSTREAM_MAX_RETRIES'],
+            backoff_base=config['UPSTREAM_BACKOFF_BASE'],
+            backoff_max=config['UPSTREAM_BACKOFF_MAX'],
+            breaker=CircuitBreaker(config['UPSTREAM_BREAKER_THRESHOLD'], config['UPSTREAM_BREAKER_RESET']),
+        )
+
+    def connect(self, max_connections=10, transport=None):
+        """A pooled keep-alive HTTP session; use it as `async with` for one batch of calls."""
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        return httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits, transport=transport)
+
+    def _backoff(self, attempt, response=None):
+        """Seconds to wait before retry number attempt + 1 (full jitter, Retry-After honoured)."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), self.backoff_max))
+        return delay
+
+    async def get(self, http, path, params=None, sink=None):
+        """
+        GET path through the session `http` and return the successful response.
+        With a sink (write() and reset(), e.g. a SpooledBody) the body is streamed into
+        it chunk by chunk instead of being read into the response.
+        Raises UpstreamUnavailable while the circuit is open and httpx.HTTPError once
+        retries are exhausted (or for a non-retryable status).
+        """
+        if not self.breaker.allow():
+            self.metrics.record_rejected()
+            raise UpstreamUnavailable("AviationStack circuit is open")
+
+        for attempt in range(self.max_retries + 1):
+            last_try = attempt == self.max_retries
+            started = time.perf_counter()
+            try:
+                async with http.stream('GET', path, params=params) as response:
+                    if sink is not None and response.is_success:
+                        async for chunk in response.aiter_bytes():
+                            sink.write(chunk)
+                    else:
+                        await response.aread()
+            except httpx.TransportError:
+                if sink is not None:
+                    sink.reset()
+                self.metrics.record(time.perf_counter() - started)
+                if last_try:
+                    self.breaker.record_failure()
+                    raise
+                self.metrics.record_retry()
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            self.metrics.record(time.perf_counter() - started, response.status_code)
+            if response.status_code in RETRY_STATUSES:
+                if not last_try:
+                    self.metrics.record_retry()
+                    await asyncio.sleep(self._backoff(attempt, response))
+                    continue
+                self.breaker.record_failure()
+            response.raise_for_status()  # Other 4xx are our fault: no retry, the circuit stays as is
+            self.breaker.record_success()
+            return response
+
+
+def get_upstream(app):
+    """The app's UpstreamClient, created once so its breaker and metrics span every refresh."""
+    upstream = app.extensions.get('upstream')
+    if upstream is None:
+        upstream = app.extensions.setdefault('upstream', UpstreamClient.from_config(app.config))
+    return upstream
+
+
+def upstream_stats(app):
+    upstream = get_upstream(app)
+    return {"circuit": upstream.breaker.as_dict(), **upstream.metrics.as_dict()}
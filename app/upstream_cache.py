@@ -0,0 +1,138 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import httpx
+
+IGNORED_PARAMS = {'access_key'}  # Never part of a key, never written to disk
+
+
+def cache_key(path, params):
+    """Stable key of an upstream request: endpoint name plus sorted parameters."""
+    endpoint = path.rstrip('/').rsplit('/', 1)[-1]
+    items = sorted((name, str(value)) for name, value in params.items() if name not in IGNORED_PARAMS)
+    return hashlib.sha1(json.dumps([endpoint, items]).encode('utf-8')).hexdigest()
+
+
+class SpooledBody:
+    """
+    A response body as it is downloaded: kept in memory up to `max_size` bytes, in a
+    temporary file past that, and hashed chunk by chunk.
+    """
+
+    def __init__(self, max_size=1024 * 1024):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_size)
+        self._hash = hashlib.sha256()
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self._hash.update(chunk)
+
+    def reset(self):
+        """Drop what a failed attempt wrote."""
+        self.file.seek(0)
+        self.file.truncate()
+        self._hash = hashlib.sha256()
+
+    @property
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def rewind(self):
+        self.file.seek(0)
+        return self.file
+
+    def close(self):
+        self.file.close()
+
+
+class ResponseCache:
+    """
+    Raw upstream responses on disk, one gzip-compressed snapshot per request.
+    Next to each snapshot a small JSON file records when it was fetched, the hash of
+    the body and the pagination total, so freshness and "unchanged" checks never
+    decompress anything.
+    """
+
+    def __init__(self, directory, ttl=300):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _meta_path(self, key):
+        return os.path.join(self.directory, f"{key}.meta.json")
+
+    def _write(self, path, data):
+        # Write then rename so readers never see a partial file
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def lookup(self, key):
+        """Metadata of the stored snapshot, or None."""
+        try:
+            with open(self._meta_path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, meta):
+        return time.time() - meta['fetched_at'] < self.ttl
+
+    def load_body(self, key):
+        """Decompressed body of the stored snapshot; raises FileNotFoundError if there is none."""
+        with gzip.open(self._body_path(key), 'rb') as f:
+            return f.read()
+
+    def store(self, key, path, params, body, total):
+        """Store a SpooledBody, compressing it as it is copied."""
+        meta = {
+            "endpoint": path,
+            "params": {name: value for name, value in params.items() if name not in IGNORED_PARAMS},
+            "fetched_at": time.time(),
+            "hash": body.hexdigest,
+            "total": total,
+        }
+        body_path = self._body_path(key)
+        with gzip.open(f"{body_path}.tmp", 'wb') as f:
+            shutil.copyfileobj(body.rewind(), f)
+        os.replace(f"{body_path}.tmp", body_path)
+        self._write(self._meta_path(key), json.dumps(meta).encode('utf-8'))
+
+    def touch(self, key, meta):
+        """Mark an unchanged snapshot as fetched now."""
+        meta = dict(meta, fetched_at=time.time())
+        self._write(self._meta_path(key), json.dumps(meta).encode('utf-8'))
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport answering from stored snapshots instead of the network, for
+    offline runs, tests and benchmarks. Requests without a snapshot get a 404.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    async def handle_async_request(self, request):
+        key = cache_key(request.url.path, dict(request.url.params))
+        try:
+            body = self.cache.load_body(key)
+        except FileNotFoundError:
+            return httpx.Response(404, json={"error": "No stored snapshot for this request"})
+        return httpx.Response(200, content=body, headers={'Content-Type': 'application/json'})
+
+
+def get_response_cache(app):
+    """The app's ResponseCache, or None when UPSTREAM_CACHE_ENABLED is off."""
+    if not app.config['UPSTREAM_CACHE_ENABLED']:
+        return None
+    directory = app.config['UPSTREAM_CACHE_DIR'] or os.path.join(app.instance_path, 'upstream_cache')
+    return ResponseCache(directory, app.config['UPSTREAM_CACHE_TTL'])
@@ -1,8 +1,15 @@
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, g
+import base64
+import json
 import jwt
+from app.token_cache import verify_token
 
 def admin_required(f):
+    """
+    Require a valid admin JWT. The decoded claims are put on g.admin_claims (and the
+    raw token on g.admin_token) for the handler.
+    """
     @wraps(f)
     def decorated(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
@@ -18,8 +25,8 @@ def admin_required(f):
         token = auth_header.split(" ")[1]
 
         try:
-            # Decode the token
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+            # Decode the token; claims of recently verified tokens are reused
+            data = verify_token(current_app, token)
 
             # Check if the user has the 'admin' role
             if data.get('role') != 'admin':
@@ -32,21 +39,36 @@ def admin_required(f):
         except Exception as e:
             return jsonify({"message": f"An error occurred: {str(e)}"}), 500
 
+        g.admin_claims = data
+        g.admin_token = token
         return f(*args, **kwargs)
 
     return decorated
-def calculate_compensation(delay):
-    """
-    Calculate compensation based on the delay duration.
-    :param delay: The delay duration in minutes.
-    :return: Compensation amount as a numeric value.
-    """
-    if delay < 120:
-        return 0  # No compensation for delays under 2 hours
-    elif 120 <= delay < 180:
-        return 100  # 2–3 hours
-    elif 180 <= delay < 240:
-        return 200  # 3–4 hours
-    else:
-        return 300  # More than 4 hours
-    
\ No newline at end of file
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_page_limit(args):
+    """Read the `limit` query parameter; raises ValueError if it is out of range."""
+    try:
+        limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def encode_cursor(last_id):
+    """Turn the last id of a page into an opaque cursor token."""
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the id encoded in a cursor token; raises ValueError if it is malformed."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded.encode()))["id"])
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark of lookups by flight_number.
+
+Loads N flights into an in-memory SQLite database, then times
+- sql:      one SELECT of FLIGHT_COLUMNS per lookup (FLIGHT_SNAPSHOT_ENABLED off)
+- snapshot: app.flight_snapshot (FLIGHT_SNAPSHOT_ENABLED on)
+and reports how long the snapshot takes to build and its size per 100k flights.
+
+Usage: python benchmarks/flight_snapshot.py [N]   (default 100000)
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # The repository root, for `app`
+
+from serialize_flights import load_flights  # Also points the app at an in-memory database
+from app import create_app, db
+from app.flight_snapshot import get_flight_snapshot, lookup_flight
+
+LOOKUPS = 20000
+
+
+def timed(label, app, numbers):
+    started = time.perf_counter()
+    for number in numbers:
+        lookup_flight(app, number)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<9} {elapsed / len(numbers) * 1e6:8.1f} µs/lookup")
+
+
+def main(count):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        load_flights(count)
+        numbers = [f"BM{random.randrange(count)}" for _ in range(LOOKUPS)]
+
+        timed("sql", app, numbers)
+
+        app.config['FLIGHT_SNAPSHOT_ENABLED'] = True
+        snapshot = get_flight_snapshot(app)
+        started = time.perf_counter()
+        snapshot.sync()
+        print(f"build     {time.perf_counter() - started:8.3f} s for {count:,} flights")
+        timed("snapshot", app, numbers)
+
+        stats = snapshot.as_dict()
+        print(f"memory    {stats['bytes_per_100k_flights'] / 1e6:8.1f} MB per 100k flights")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,114 @@
+"""
+Micro-benchmark of the flight list serialization path.
+
+Loads N flights into an in-memory SQLite database, then times
+- before: ORM instances, a hand-built dict per flight, stdlib json
+- after:  column tuples, app.serializers, the app's JSON provider (orjson if installed)
+
+Usage: python benchmarks/serialize_flights.py [N]   (default 100000)
+"""
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # The repository root, for `app`
+
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import insert, select
+from app.config import Config
+
+Config.SQLALCHEMY_DATABASE_URI = 'sqlite://'  # Keep the benchmark away from flights.db
+
+from app import create_app, db
+from app.models import Flight
+from app.serializers import FLIGHT_COLUMNS, serialize_flights, orjson
+
+
+def legacy_flight_response(flight):
+    """The per-instance dict the endpoints used to build."""
+    return {
+        "id": flight.id,
+        "flight_number": flight.flight_number,
+        "flight_date": flight.flight_date.isoformat() if flight.flight_date else None,
+        "flight_status": flight.flight_status,
+        "departure": {
+            "actual": flight.departure_actual.isoformat() if flight.departure_actual else None,
+            "airport": flight.departure_airport,
+            "iata": flight.departure_iata,
+            "delay": flight.departure_delay,
+            "scheduled": flight.departure_scheduled.isoformat() if flight.departure_scheduled else None,
+            "timezone": flight.departure_timezone
+        },
+        "arrival": {
+            "actual": flight.arrival_actual.isoformat() if flight.arrival_actual else None,
+            "airport": flight.arrival_airport,
+            "iata": flight.arrival_iata,
+            "scheduled": flight.arrival_scheduled.isoformat() if flight.arrival_scheduled else None,
+            "timezone": flight.arrival_timezone
+        },
+        "airline": {
+            "name": flight.airline_name
+        }
+    }
+
+
+def load_flights(count):
+    start = datetime(2025, 1, 1, 6, 0)
+    rows = []
+    for i in range(count):
+        scheduled = start + timedelta(minutes=i)
+        rows.append({
+            "flight_number": f"BM{i}",
+            "flight_date": scheduled.replace(hour=0, minute=0),
+            "flight_status": "landed",
+            "departure_airport": "Tunis Carthage",
+            "departure_timezone": "Africa/Tunis",
+            "departure_iata": "TUN",
+            "departure_delay": float(i % 300),
+            "departure_scheduled": scheduled,
+            "departure_actual": scheduled + timedelta(minutes=i % 300),
+            "arrival_airport": "Charles de Gaulle",
+            "arrival_timezone": "Europe/Paris",
+            "arrival_iata": "CDG",
+            "arrival_scheduled": scheduled + timedelta(hours=2),
+            "arrival_actual": scheduled + timedelta(hours=2, minutes=i % 300),
+            "airline_name": "Tunisair",
+        })
+    for offset in range(0, count, 5000):
+        db.session.execute(insert(Flight), rows[offset:offset + 5000])
+    db.session.commit()
+
+
+def timed(label, count, run):
+    db.session.expunge_all()
+    started = time.perf_counter()
+    body = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<8} {elapsed:7.3f}s  {count / elapsed:>10,.0f} rows/s  {len(body):>12,} bytes")
+    return body
+
+
+def main(count):
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        load_flights(count)
+        stdlib = DefaultJSONProvider(app)
+
+        def before():
+            flights = Flight.query.order_by(Flight.id).all()
+            return stdlib.dumps({"flights": [legacy_flight_response(flight) for flight in flights]})
+
+        def after():
+            rows = db.session.execute(select(*FLIGHT_COLUMNS).order_by(Flight.id)).all()
+            return app.json.dumps({"flights": serialize_flights(rows)})
+
+        print(f"{count:,} flights, JSON encoder: {'orjson' if orjson else 'stdlib'}")
+        old = timed("before", count, before)
+        new = timed("after", count, after)
+        assert app.json.loads(old) == app.json.loads(new), "serializers changed the payload"
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
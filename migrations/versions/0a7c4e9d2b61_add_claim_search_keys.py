@@ -0,0 +1,81 @@
+"""Add normalized passenger and flight search keys to claims
+
+Revision ID: 0a7c4e9d2b61
+Revises: f3b8c1d27a94
+Create Date: 2026-10-18 18:02:37.540912
+
+"""
+import unicodedata
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0a7c4e9d2b61'
+down_revision = 'f3b8c1d27a94'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+# Copies of app.models.normalize_* as of this revision, so later changes there cannot alter it
+def normalize_passenger_name(passenger_name):
+    return ' '.join(unicodedata.normalize('NFKC', passenger_name).split()).casefold()
+
+
+def normalize_flight_number(flight_number):
+    return ''.join(flight_number.split()).upper()
+
+
+claims = sa.table('claims',
+    sa.column('id', sa.Integer),
+    sa.column('passenger_name', sa.String),
+    sa.column('flight_number', sa.String),
+    sa.column('passenger_key', sa.String),
+    sa.column('flight_key', sa.String),
+)
+
+
+def upgrade():
+    op.add_column('claims', sa.Column('passenger_key', sa.String(length=100), nullable=True))
+    op.add_column('claims', sa.Column('flight_key', sa.String(length=50), nullable=True))
+
+    # Backfill in Python: Unicode normalization and casefolding have no portable SQL equivalent
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(claims.c.id, claims.c.passenger_name, claims.c.flight_number)
+            .where(claims.c.id > last_id).order_by(claims.c.id).limit(BACKFILL_CHUNK_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        connection.execute(
+            claims.update().where(claims.c.id == sa.bindparam('claim_id')).values(
+                passenger_key=sa.bindparam('passenger_key'), flight_key=sa.bindparam('flight_key')
+            ),
+            [{"claim_id": row.id,
+              "passenger_key": normalize_passenger_name(row.passenger_name),
+              "flight_key": normalize_flight_number(row.flight_number)} for row in rows]
+        )
+
+    # The expression index is superseded; drop it first so batch mode can copy the table on SQLite
+    op.drop_index('ix_claims_lower_passenger_flight', table_name='claims')
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.alter_column('passenger_key', existing_type=sa.String(length=100), nullable=False)
+        batch_op.alter_column('flight_key', existing_type=sa.String(length=50), nullable=False)
+    op.create_index('ix_claims_passenger_key_flight_key', 'claims', ['passenger_key', 'flight_key'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_claims_passenger_key_flight_key', table_name='claims')
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.drop_column('flight_key')
+        batch_op.drop_column('passenger_key')
+    op.create_index(
+        'ix_claims_lower_passenger_flight', 'claims',
+        [sa.text('lower(passenger_name)'), sa.text('lower(flight_number)')],
+        unique=False
+    )
@@ -0,0 +1,28 @@
+"""Add sync_state table
+
+Revision ID: 7b1f3c2a9d10
+Revises: 4e67d4bca4e5
+Create Date: 2026-10-18 09:12:41.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b1f3c2a9d10'
+down_revision = '4e67d4bca4e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sync_state',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('last_refreshed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_state')
@@ -0,0 +1,32 @@
+"""Add rate_limit_counters table
+
+Revision ID: 9e4d7b2c6a18
+Revises: 5c2f8e1a9d37
+Create Date: 2026-10-18 19:47:12.530694
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4d7b2c6a18'
+down_revision = '5c2f8e1a9d37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rate_limit_counters',
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('window', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index('ix_rate_limit_counters_expires_at', 'rate_limit_counters', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_rate_limit_counters_expires_at', table_name='rate_limit_counters')
+    op.drop_table('rate_limit_counters')
@@ -0,0 +1,30 @@
+"""Add flight change tracking columns
+
+Revision ID: a3c5e8f0b6d2
+Revises: 7b1f3c2a9d10
+Create Date: 2026-10-18 10:03:15.772941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c5e8f0b6d2'
+down_revision = '7b1f3c2a9d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows keep a NULL fingerprint and are rewritten on the next ingestion
+    op.add_column('flights', sa.Column('fingerprint', sa.String(length=40), nullable=True))
+    op.add_column('flights', sa.Column('last_modified', sa.DateTime(), nullable=True))
+    op.create_index('ix_flights_last_modified', 'flights', ['last_modified'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_flights_last_modified', table_name='flights')
+    with op.batch_alter_table('flights') as batch_op:
+        batch_op.drop_column('last_modified')
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,39 @@
+"""Widen admins.password_hash to 256 characters
+
+Revision ID: b7e3a5d91c40
+Revises: 9e4d7b2c6a18
+Create Date: 2026-10-18 20:05:33.117482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3a5d91c40'
+down_revision = '9e4d7b2c6a18'
+branch_labels = None
+depends_on = None
+
+
+def _has_admins():
+    # The admins table is made by create_all (create_admin.py), so it may not exist yet
+    return 'admins' in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade():
+    # scrypt hashes (about 162 characters) do not fit the old 128
+    if not _has_admins():
+        return
+    with op.batch_alter_table('admins') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128),
+                              type_=sa.String(length=256), existing_nullable=False)
+
+
+def downgrade():
+    # Fails on PostgreSQL while a stored hash is longer than 128 characters
+    if not _has_admins():
+        return
+    with op.batch_alter_table('admins') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=256),
+                              type_=sa.String(length=128), existing_nullable=False)
@@ -0,0 +1,32 @@
+"""Add flight_date to claims
+
+Revision ID: c5d9a2e7f318
+Revises: b7e3a5d91c40
+Create Date: 2026-10-18 21:32:40.274518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5d9a2e7f318'
+down_revision = 'b7e3a5d91c40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.add_column(sa.Column('flight_date', sa.DateTime(), nullable=True))
+
+    # Existing claims were filed against the only day stored per flight number: its latest
+    op.execute(sa.text(
+        "UPDATE claims SET flight_date = ("
+        "SELECT MAX(flights.flight_date) FROM flights WHERE flights.flight_number = claims.flight_number)"
+    ))
+
+
+def downgrade():
+    with op.batch_alter_table('claims') as batch_op:
+        batch_op.drop_column('flight_date')
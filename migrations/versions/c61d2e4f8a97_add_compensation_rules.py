@@ -0,0 +1,41 @@
+"""Add compensation_rules table
+
+Revision ID: c61d2e4f8a97
+Revises: a3c5e8f0b6d2
+Create Date: 2026-10-18 11:20:08.415632
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c61d2e4f8a97'
+down_revision = 'a3c5e8f0b6d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    rules = op.create_table('compensation_rules',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('min_delay', sa.Integer(), nullable=False),
+    sa.Column('max_delay', sa.Integer(), nullable=True),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('currency', sa.String(length=3), nullable=False),
+    sa.Column('airline_name', sa.String(length=50), nullable=True),
+    sa.Column('effective_from', sa.Date(), nullable=True),
+    sa.Column('effective_to', sa.Date(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    # Seed the tiers that used to be hard-coded
+    op.bulk_insert(rules, [
+        {'min_delay': 120, 'max_delay': 180, 'amount': 100, 'currency': 'TND'},
+        {'min_delay': 180, 'max_delay': 240, 'amount': 200, 'currency': 'TND'},
+        {'min_delay': 240, 'max_delay': None, 'amount': 300, 'currency': 'TND'},
+    ])
+
+
+def downgrade():
+    op.drop_table('compensation_rules')
@@ -0,0 +1,44 @@
+"""Add indexes matching the query patterns
+
+Revision ID: d84b7a1c3e52
+Revises: c61d2e4f8a97
+Create Date: 2026-10-18 12:41:53.018266
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd84b7a1c3e52'
+down_revision = 'c61d2e4f8a97'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep one row per (flight_number, flight_date), the newest, so the unique index can be built.
+    # The derived table lets MySQL delete from the table the subquery reads.
+    op.execute(sa.text(
+        "DELETE FROM flights WHERE id NOT IN ("
+        "SELECT id FROM (SELECT MAX(id) AS id FROM flights GROUP BY flight_number, flight_date) AS keep)"
+    ))
+    # The natural key; as its leading column, flight_number also serves every lookup by number
+    op.create_index('uq_flights_flight_number_date', 'flights', ['flight_number', 'flight_date'], unique=True)
+    op.create_index('ix_flights_flight_date', 'flights', ['flight_date'], unique=False)
+
+    op.create_index('ix_claims_flight_number', 'claims', ['flight_number'], unique=False)
+    op.create_index('ix_claims_status_id', 'claims', ['status', 'id'], unique=False)
+    op.create_index(
+        'ix_claims_lower_passenger_flight', 'claims',
+        [sa.text('lower(passenger_name)'), sa.text('lower(flight_number)')],
+        unique=False
+    )
+
+
+def downgrade():
+    op.drop_index('ix_claims_lower_passenger_flight', table_name='claims')
+    op.drop_index('ix_claims_status_id', table_name='claims')
+    op.drop_index('ix_claims_flight_number', table_name='claims')
+    op.drop_index('ix_flights_flight_date', table_name='flights')
+    op.drop_index('uq_flights_flight_number_date', table_name='flights')
@@ -0,0 +1,27 @@
+"""Add version counter to sync_state
+
+Revision ID: e2a9f6b41c08
+Revises: d84b7a1c3e52
+Create Date: 2026-10-18 14:05:27.661390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a9f6b41c08'
+down_revision = 'd84b7a1c3e52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('sync_state', sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('sync_state', sa.Column('modified_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('sync_state') as batch_op:
+        batch_op.drop_column('modified_at')
+        batch_op.drop_column('version')
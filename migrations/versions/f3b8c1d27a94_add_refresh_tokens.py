@@ -0,0 +1,35 @@
+"""Add refresh_tokens table
+
+Revision ID: f3b8c1d27a94
+Revises: e2a9f6b41c08
+Create Date: 2026-10-18 16:48:09.312774
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b8c1d27a94'
+down_revision = 'e2a9f6b41c08'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('refresh_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('admin_id', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    op.create_index('ix_refresh_tokens_admin_id', 'refresh_tokens', ['admin_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_refresh_tokens_admin_id', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
@@ -0,0 +1,145 @@
+"""
+FlightFetcher.run against a stub AviationStack served by httpx.MockTransport:
+pagination, the unchanged-page skip and failure accounting, without network access.
+"""
+import json
+import httpx
+from app.flight_fetcher import FlightFetcher
+from app.upstream import UpstreamClient
+from app.upstream_cache import ResponseCache
+
+TOTAL = 250  # Flights per (airport, direction) query: three pages of 100
+
+
+def stub_flights(airport, direction, offset, limit):
+    return [
+        {
+            "flight_date": "2025-01-19",
+            "flight_status": "scheduled",
+            "flight": {"iata": f"{airport}{direction[0].upper()}{number}"},
+            "airline": {"name": "Tunisair"},
+            "departure": {"iata": airport if direction == 'dep' else "CDG", "delay": number % 300},
+            "arrival": {"iata": airport if direction == 'arr' else "CDG"},
+        }
+        for number in range(offset, min(offset + limit, TOTAL))
+    ]
+
+
+class StubAviationStack:
+    """Answers /flights like AviationStack; `failures` maps an offset to the status to answer instead."""
+
+    def __init__(self, failures=None):
+        self.failures = failures or {}
+        self.requests = []
+
+    def __call__(self, request):
+        params = request.url.params
+        direction = 'dep' if 'dep_iata' in params else 'arr'
+        airport = params[f'{direction}_iata']
+        offset, limit = int(params['offset']), int(params['limit'])
+        self.requests.append((airport, direction, offset))
+
+        failure = self.failures.get(offset)
+        if failure == 'no-data':
+            # AviationStack reports quota errors in a 200 body without 'data'
+            return httpx.Response(200, json={"error": {"code": "usage_limit_reached"}})
+        if failure:
+            return httpx.Response(failure, json={"error": {"code": "stub"}})
+        return httpx.Response(200, content=json.dumps({
+            "pagination": {"limit": limit, "offset": offset, "total": TOTAL},
+            "data": stub_flights(airport, direction, offset, limit),
+        }).encode('utf-8'))
+
+
+def make_fetcher(stub, **options):
+    upstream = UpstreamClient('https://stub.aviationstack.test/v1', max_retries=0, backoff_base=0)
+    return FlightFetcher(upstream, 'test-key', transport=httpx.MockTransport(stub), **options)
+
+
+def run(fetcher):
+    flights = []
+    ok = fetcher.run(flights.extend)
+    return ok, flights
+
+
+def test_walks_every_page_of_every_query():
+    stub = StubAviationStack()
+    fetcher = make_fetcher(stub, airports=['tun', ' MIR '], page_limit=100, batch_size=40)
+
+    ok, flights = run(fetcher)
+
+    assert ok
+    assert fetcher.pages == 12 and fetcher.failed_pages == 0
+    assert sorted(stub.requests) == sorted(
+        (airport, direction, offset)
+        for airport in ('TUN', 'MIR') for direction in ('dep', 'arr') for offset in (0, 100, 200)
+    )
+    numbers = [flight['flight_number'] for flight in flights]
+    assert len(numbers) == len(set(numbers)) == 4 * TOTAL
+    assert flights[0]['airline_name'] == 'Tunisair'
+
+
+def test_max_pages_bounds_each_query():
+    stub = StubAviationStack()
+    fetcher = make_fetcher(stub, airports=['TUN'], directions=['dep'], page_limit=100, max_pages=2)
+
+    ok, flights = run(fetcher)
+
+    assert ok
+    assert sorted(offset for _airport, _direction, offset in stub.requests) == [0, 100]
+    assert len(flights) == 200
+
+
+def test_unchanged_pages_are_not_handed_over_again(tmp_path):
+    stub = StubAviationStack()
+    cache = ResponseCache(str(tmp_path), ttl=0)  # Always request again, compare the bodies
+
+    ok, flights = run(make_fetcher(stub, airports=['TUN'], directions=['dep'], cache=cache))
+    assert ok and len(flights) == TOTAL
+
+    fetcher = make_fetcher(stub, airports=['TUN'], directions=['dep'], cache=cache)
+    ok, flights = run(fetcher)
+    assert ok and flights == []
+    assert fetcher.pages == 3 and fetcher.unchanged_pages == 3
+    assert len(stub.requests) == 6
+
+    forced = make_fetcher(stub, airports=['TUN'], directions=['dep'], cache=cache, force=True)
+    ok, flights = run(forced)
+    assert ok and len(flights) == TOTAL and forced.unchanged_pages == 0
+
+
+def test_fresh_snapshots_are_not_requested(tmp_path):
+    stub = StubAviationStack()
+    cache = ResponseCache(str(tmp_path), ttl=300)
+    run(make_fetcher(stub, airports=['TUN'], directions=['dep'], cache=cache))
+
+    fetcher = make_fetcher(stub, airports=['TUN'], directions=['dep'], cache=cache)
+    ok, flights = run(fetcher)
+
+    assert ok and flights == []
+    assert fetcher.cached_pages == 3
+    assert len(stub.requests) == 3
+
+
+def test_failed_pages_are_counted_and_the_others_saved():
+    stub = StubAviationStack(failures={100: 503, 200: 'no-data'})
+    fetcher = make_fetcher(stub, airports=['TUN'], directions=['dep'], page_limit=100)
+
+    ok, flights = run(fetcher)
+
+    assert not ok
+    assert fetcher.failed_pages == 2 and fetcher.pages == 1
+    assert len(flights) == 100
+    assert fetcher.upstream.metrics.statuses[503] == 1
+
+
+def test_a_failed_first_page_stops_its_query_only():
+    stub = StubAviationStack(failures={0: 404})
+    fetcher = make_fetcher(stub, airports=['TUN'], directions=['dep', 'arr'], page_limit=100)
+
+    ok, flights = run(fetcher)
+
+    assert not ok
+    # Without the first page the total is unknown, so neither query goes further
+    assert fetcher.failed_pages == 2
+    assert flights == [] and len(stub.requests) == 2